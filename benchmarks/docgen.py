@@ -0,0 +1,309 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Generator of synthetic component design documents, with the table layouts RestProcessor expects.
+#
+# Usage: python benchmarks/docgen.py [--functions N] [--types N] ... > input.rst
+
+from argparse import ArgumentParser
+from typing import NamedTuple, List, Optional
+
+class DocSize(NamedTuple):
+    headers: int = 3
+    functions: int = 20
+    types: int = 10
+    enums: int = 5
+    macro_constant_groups: int = 5
+    macro_functions: int = 5
+    variable_groups: int = 5
+    artifacts: int = 10
+    params: int = 3
+    # Sections of prose, requirement items and sequence diagrams, which the generation ignores.
+    prose_sections: int = 0
+    # Global fields besides :module:, added to every header.
+    global_fields: int = 0
+
+    def scaled(self, factor: int) -> 'DocSize':
+        """Return the size with all element counts multiplied by factor. The number of headers is kept."""
+        return self._replace(**{ f: getattr(self, f) * factor for f in self._fields
+                                 if f not in ('headers', 'params') })
+
+# A table row is (label, cells). A label of None continues the label cell of the row above.
+# Each cell is (column span, text lines) and the spans of a row add up to _CONTENT_COLUMNS.
+_CONTENT_COLUMNS = 3
+
+def _row(label: Optional[str], *cells):
+    return (label, [ (span, text.split('\n')) for span, text in cells ])
+
+def _code_block(code: str) -> str:
+    return '.. code-block::\n\n    ' + code
+
+def grid_table(rows) -> List[str]:
+    """Return the lines of a grid table with a label column and _CONTENT_COLUMNS content columns.
+
+    The first row is the table header. The borders have a '+' at every column boundary, even where a
+    cell spans several columns, which docutils accepts.
+    """
+    widths = [ 0 ] * (_CONTENT_COLUMNS + 1)
+    for label, cells in rows:
+        if label is not None:
+            widths[0] = max(widths[0], len(label) + 2)
+        col = 1
+        for span, lines in cells:
+            if span == 1:
+                widths[col] = max(widths[col], max(len(l) for l in lines) + 2)
+            col += span
+    widths = [ max(w, 3) for w in widths ]
+    for label, cells in rows:
+        col = 1
+        for span, lines in cells:
+            needed = max(len(l) for l in lines) + 2
+            available = sum(widths[col:col + span]) + span - 1
+            if needed > available:
+                widths[col + span - 1] += needed - available
+            col += span
+
+    def border(fill, continued=False):
+        if continued:
+            line = '|' + ' ' * widths[0] + '+'
+        else:
+            line = '+' + fill * widths[0] + '+'
+        return line + ''.join(fill * w + '+' for w in widths[1:])
+
+    out = [ border('-') ]
+    for n, (label, cells) in enumerate(rows):
+        height = max(len(lines) for _, lines in cells)
+        label_lines = [ label ] if label is not None else []
+        for i in range(height):
+            text = label_lines[i] if i < len(label_lines) else ''
+            line = '| ' + text.ljust(widths[0] - 1) + '|'
+            col = 1
+            for span, lines in cells:
+                text = lines[i] if i < len(lines) else ''
+                line += ' ' + text.ljust(sum(widths[col:col + span]) + span - 2) + '|'
+                col += span
+            out.append(line)
+        if n == 0:
+            out.append(border('='))
+        elif n + 1 < len(rows):
+            out.append(border('-', rows[n + 1][0] is None))
+    out.append(border('-'))
+    return out
+
+def _table(rows) -> List[str]:
+    return [ '.. table::', '    :align: left', '' ] + [ '    ' + l for l in grid_table(rows) ] + [ '', '' ]
+
+def _section(title: str, underline: str) -> List[str]:
+    return [ title, underline * len(title), '' ]
+
+def _spread(n: int, headers: List[str]) -> str:
+    return headers[n % len(headers)]
+
+def make_dependency_diagram(num_artifacts: int, headers: Optional[List[str]] = None,
+                            source: str = 'Mod.c') -> str:
+    """Return a restuml2code dependency diagram with a chain of num_artifacts external headers.
+
+    Each of the given module headers includes one of the external headers and the source file includes
+    all module headers.
+    """
+    headers = headers if headers is not None else []
+    lines = [ ':restuml2code:', '', '@startuml', '', 'left to right direction', '' ]
+    for n in range(num_artifacts):
+        lines.append('artifact Mod_%d.h <<header>>' % n)
+    for h in headers:
+        lines.append('artifact %s <<header>>' % h)
+    lines.append('artifact %s <<source>>' % source)
+    lines.append('')
+    for n in range(1, num_artifacts):
+        lines.append('Mod_%d.h ..> Mod_%d.h : <<include>>' % (n, n - 1))
+    for n, h in enumerate(headers):
+        if num_artifacts > 0:
+            lines.append('%s ..> Mod_%d.h : <<include>>' % (h, n % num_artifacts))
+        lines.append('%s ..> %s : <<include>>' % (source, h))
+    if not headers and num_artifacts > 0:
+        lines.append('%s ..> Mod_%d.h : <<include>>' % (source, num_artifacts - 1))
+    lines.append('@enduml')
+    return '\n'.join(lines) + '\n'
+
+def _function_table(n: int, header: str, num_params: int):
+    name = 'Bench_function%d' % n
+    params = [ 'param%d' % p for p in range(num_params) ]
+    syntax = 'Std_ReturnType %s(%s)' % (name, ', '.join('uint32 ' + p for p in params) or 'void')
+    rows = [ _row('Function name:', (3, name)),
+             _row('Description:', (3, 'Function number %d of the benchmark module.\nIt does nothing useful.' % n)),
+             _row('Syntax:', (3, _code_block(syntax))),
+             _row('Declared in:', (3, header)),
+             _row('May be called from ISR:', (3, 'No')),
+             _row('Reentrancy:', (3, 'Non-Reentrant')),
+             _row('Return value:', (1, 'Std_ReturnType'), (2, 'E_OK if the call succeeded, E_NOT_OK otherwise.')) ]
+    for p, param in enumerate(params):
+        rows.append(_row('Parameters [in]:' if p == 0 else None, (1, param), (2, 'Input parameter %d.' % p)))
+    return _table(rows)
+
+def _struct_table(n: int, header: str, num_fields: int):
+    name = 'Bench_Struct%dType' % n
+    rows = [ _row('Type name:', (3, name)),
+             _row('Description:', (3, 'Structure number %d of the benchmark module.' % n)),
+             _row('Kind:', (3, 'Structure')),
+             _row('Declared in:', (3, header)) ]
+    for f in range(num_fields):
+        rows.append(_row('Elements:' if f == 0 else None, (1, 'uint32'), (1, 'field%d' % f),
+                         (1, 'Description of field%d.' % f)))
+    return _table(rows)
+
+def _typedef_table(n: int, header: str):
+    name = 'Bench_Typedef%dType' % n
+    return _table([ _row('Type name:', (3, name)),
+                    _row('Description:', (3, 'Type number %d of the benchmark module.' % n)),
+                    _row('Kind:', (3, 'Typedef')),
+                    _row('Declared in:', (3, header)),
+                    _row('Type:', (3, _code_block('uint16 ' + name))) ])
+
+def _enum_table(n: int, header: str, num_constants: int):
+    name = 'Bench_Enum%dType' % n
+    rows = [ _row('Type name:', (3, name)),
+             _row('Description:', (3, 'Enumeration number %d of the benchmark module.' % n)),
+             _row('Kind:', (3, 'Enumeration')),
+             _row('Declared in:', (3, header)) ]
+    for c in range(num_constants):
+        rows.append(_row('Constants:' if c == 0 else None, (1, 'BENCH_ENUM%d_VALUE%d' % (n, c)),
+                         (1, str(c) if c == 0 else ''), (1, 'Enumerator %d.' % c)))
+    return _table(rows)
+
+def _macro_constants_table(n: int, header: str, num_constants: int):
+    rows = [ _row('Constants Group:', (3, 'Constants group %d' % n)),
+             _row('Declared in:', (3, header)) ]
+    for c in range(num_constants):
+        rows.append(_row('Constants:' if c == 0 else None, (1, 'BENCH_GROUP%d_CONSTANT%d' % (n, c)),
+                         (1, '0x%02X' % c), (1, 'Constant %d of group %d.' % (c, n))))
+    return _table(rows)
+
+def _variables_table(n: int, header: str, num_variables: int):
+    rows = [ _row('Variables Group:', (3, 'Variables group %d' % n)),
+             _row('Declared in:', (3, header)) ]
+    for v in range(num_variables):
+        rows.append(_row('Variables:' if v == 0 else None, (1, 'Description:'), (2, 'Variable %d of group %d.' % (v, n))))
+        rows.append(_row(None, (1, 'Syntax:'), (2, _code_block('uint32 bench_group%d_var%d' % (n, v)))))
+    return _table(rows)
+
+def _macro_function_table(n: int, header: str, num_params: int):
+    name = 'BENCH_MACRO%d' % n
+    params = [ 'Arg%d' % p for p in range(num_params) ]
+    rows = [ _row('Identifier name:', (3, name)),
+             _row('Description:', (3, 'Function-like macro number %d of the benchmark module.' % n)),
+             _row('Syntax:', (3, _code_block('#define %s(%s)' % (name, ', '.join(params))))),
+             _row('Declared in:', (3, header)),
+             _row('May be called from ISR:', (3, 'Yes')),
+             _row('Reentrancy:', (3, 'Reentrant')),
+             _row('Return value:', (1, 'uint32'), (2, 'Sum of the arguments.')) ]
+    for p, param in enumerate(params):
+        rows.append(_row('Parameters [in]:' if p == 0 else None, (1, param), (2, 'Argument %d.' % p)))
+    rows.append(_row('Definition:', (1, 'Condition:'), (2, '``BENCH_DEV_ERROR_DETECT == STD_ON``')))
+    rows.append(_row(None, (1, 'Code:'), (2, _code_block(' + '.join('(%s)' % p for p in params) or '0'))))
+    rows.append(_row(None, (1, 'Condition:'), (2, 'default')))
+    rows.append(_row(None, (1, 'Code:'), (2, _code_block('0'))))
+    return _table(rows)
+
+def _prose_section(n: int) -> List[str]:
+    lines = _section('Requirement %d' % n, '=')
+    lines += [ '.. item:: BENCH_REQ_%d' % n, '' ]
+    for p in range(3):
+        lines += [ 'Paragraph %d of requirement %d describes the *expected behaviour* of the module in' % (p, n),
+                   'a situation that the design has to handle, refers to :ref:`bench-ref-%d` and explains' % n,
+                   'the ``Bench_Function%d`` calls made by the callers of the module.' % n, '' ]
+    lines += [ '- The module shall keep its state between the calls.',
+               '- The module shall report the errors to the callers.', '' ]
+    lines += _section('Rationale', '-')
+    lines += [ '.. uml::', '', '    Caller -> Bench: Bench_Function%d()' % n, '    Bench --> Caller: E_OK', '' ]
+    lines += [ 'Example::', '', '    Bench_Function%d(%d);' % (n, n), '' ]
+    return lines
+
+def make_document(size: DocSize = DocSize()) -> str:
+    """Return the text of a synthetic design document of the given size.
+
+    The elements are spread over size.headers generated headers, Bench.h, Bench_1.h, ...
+    """
+    headers = [ 'Bench.h' ] + [ 'Bench_%d.h' % n for n in range(1, size.headers) ]
+    lines = [ '##############', 'Bench Module', '##############', '', ':module: Bench' ]
+    lines += [ ':field-%d: Value %d' % (n, n) for n in range(size.global_fields) ]
+    lines.append('')
+    lines += _section('Structural Design', '*')
+
+    lines += _section('Source File Description', '=')
+    rows = [ _row('File:', (1, 'Generated:'), (2, 'Description:')) ]
+    for h in headers:
+        rows.append(_row(h, (1, 'Yes'), (2, 'Generated header %s.' % h)))
+    rows.append(_row('Bench.c', (1, 'No'), (2, 'Module implementation code.')))
+    lines += _table(rows)
+
+    lines += _section('Source File Dependencies', '=')
+    lines += [ '.. uml::', '' ]
+    lines += [ ('    ' + l).rstrip() for l in make_dependency_diagram(size.artifacts, headers, 'Bench.c').split('\n') ]
+    lines.append('')
+
+    lines += _section('API Specification', '*')
+
+    lines += _section('Module Interface Constants', '=')
+    for n in range(size.macro_constant_groups):
+        lines += _macro_constants_table(n, _spread(n, headers), 4)
+
+    lines += _section('Module Interface Function-like Macros', '=')
+    for n in range(size.macro_functions):
+        lines += _macro_function_table(n, _spread(n, headers), 2)
+
+    lines += _section('Module Interface Types', '=')
+    for n in range(size.types):
+        if n % 2 == 0:
+            lines += _struct_table(n, _spread(n, headers), 4)
+        else:
+            lines += _typedef_table(n, _spread(n, headers))
+    for n in range(size.enums):
+        lines += _enum_table(n, _spread(n, headers), 4)
+
+    lines += _section('Module Interface Variables', '=')
+    for n in range(size.variable_groups):
+        lines += _variables_table(n, _spread(n, headers), 2)
+
+    lines += _section('Module Interface Functions', '=')
+    for n in range(size.functions):
+        lines += _function_table(n, _spread(n, headers), size.params)
+
+    if size.prose_sections > 0:
+        lines += _section('Detailed Design', '*')
+        for n in range(size.prose_sections):
+            lines += _prose_section(n)
+
+    return '\n'.join(lines) + '\n'
+
+def add_size_arguments(parser: ArgumentParser) -> None:
+    defaults = DocSize()
+    for field in DocSize._fields:
+        parser.add_argument("--" + field.replace('_', '-'), dest=field, type=int, default=getattr(defaults, field),
+                            help="number of " + field.replace('_', ' ') + " (default: %(default)s)")
+
+def size_from_args(args) -> DocSize:
+    return DocSize(**{ f: args[f] for f in DocSize._fields })
+
+def main():
+    parser = ArgumentParser(description="Write a synthetic design document to stdout.")
+    add_size_arguments(parser)
+    args = vars(parser.parse_args())
+    print(make_document(size_from_args(args)), end='')
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Compares the memory held by the header model of a synthetic design document, built from the plain
+# dicts of its JSON form and from the slotted model elements (restuml2code.contentmodel), and the time
+# to render both with the same template.
+#
+# Usage: python benchmarks/model_memory.py [--scale N] [--repeat N] [--json results.json] [docgen size options]
+
+from argparse import ArgumentParser
+from io import StringIO
+import gc
+import json
+import os
+import statistics
+import time
+import tracemalloc
+from mako.runtime import Context
+
+from restuml2code.main import parse_rst, register_directives, load_template
+from restuml2code.restprocessor import RestProcessor
+from restuml2code.contentmodel import as_dict, headers_from_dict
+
+try:
+    from .docgen import DocSize, make_document, add_size_arguments, size_from_args
+except:
+    from docgen import DocSize, make_document, add_size_arguments, size_from_args
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "template.h")
+
+MODELS = [ ('dict', json.loads), ('slotted', lambda data: headers_from_dict(json.loads(data))) ]
+
+def model_memory(build, data):
+    """Bytes still allocated after building the model, i.e. held by the model."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        headers = build(data)
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0], headers
+    finally:
+        tracemalloc.stop()
+
+def render_time(template, headers):
+    start = time.perf_counter()
+    for header in headers:
+        if headers[header]['generated']:
+            template.render_context(Context(StringIO(), file=header, content=headers[header]))
+    return time.perf_counter() - start
+
+def benchmark(size: DocSize, template, repeat: int):
+    text = make_document(size)
+    doc = parse_rst('bench.rst', text)
+    processor = RestProcessor(doc, text)
+    doc.walkabout(processor)
+    data = json.dumps(processor._headers, default=as_dict)
+    del doc, processor
+
+    results = { 'size': size._asdict(), 'json_bytes': len(data), 'models': {} }
+    for name, build in MODELS:
+        memory, headers = model_memory(build, data)
+        render_time(template, headers)
+        times = [ render_time(template, headers) for _ in range(repeat) ]
+        results['models'][name] = { 'memory': memory, 'render_median': statistics.median(times) }
+    return results
+
+def main():
+    parser = ArgumentParser(description="Measure the memory of the restuml2code header model.")
+    add_size_arguments(parser)
+    parser.add_argument("--scale", dest="scale", type=int, action="append",
+                        help="also run with the element counts multiplied by SCALE (may be repeated)")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5, help="timed renders per model (default: %(default)s)")
+    parser.add_argument("-t", "--template", dest="template", default=DEFAULT_TEMPLATE, help="code template to render")
+    parser.add_argument("--json", dest="json", help="write the results to this JSON file")
+    args = vars(parser.parse_args())
+
+    register_directives()
+    template = load_template(args['template'])
+    base = size_from_args(args)
+    sizes = [ base ] + [ base.scaled(s) for s in (args['scale'] or []) ]
+
+    results = []
+    for size in sizes:
+        result = benchmark(size, template, args['repeat'])
+        results.append(result)
+        print("%d functions, %d types, %d headers (%.1f KiB of JSON):" % (size.functions, size.types + size.enums,
+                                                                          size.headers, result['json_bytes'] / 1024))
+        for name, _ in MODELS:
+            m = result['models'][name]
+            print("  %-8s %10.1f KiB  render %9.2f ms" % (name, m['memory'] / 1024, m['render_median'] * 1000))
+
+    if args['json']:
+        with open(args['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Times the stages of generating the headers of a synthetic design document: the pre-scan, parse_rst,
+# UML parsing, the RestProcessor walk and Mako rendering. The times are taken without tracemalloc, the peak memory
+# of every stage is measured in one extra traced run.
+#
+# Usage: python benchmarks/run.py [--scale N] [--repeat N] [--json results.json] [docgen size options]
+
+from argparse import ArgumentParser
+from io import StringIO
+import json
+import os
+import platform
+import statistics
+import time
+import tracemalloc
+from mako.runtime import Context
+
+from restuml2code import __version__
+from restuml2code import prescan
+from restuml2code.main import parse_rst, register_directives, load_template
+from restuml2code.restprocessor import RestProcessor
+from restuml2code.uml import uml
+
+try:
+    from .docgen import DocSize, make_document, add_size_arguments, size_from_args
+except:
+    from docgen import DocSize, make_document, add_size_arguments, size_from_args
+
+DEFAULT_TEMPLATE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "template.h")
+
+STAGES = [ 'prescan', 'parse_rst', 'uml', 'walk', 'render' ]
+
+class _ScannedUml:
+    """Holds the UML scan results of the uml stage, so that the walk does not parse the diagrams again."""
+
+    def __init__(self) -> None:
+        self._scanners = {}
+
+    def get(self, text):
+        return self._scanners.get(text)
+
+    def put(self, text, scanner):
+        self._scanners[text] = scanner
+
+def run_stages(text, template, measure, use_prescan=True):
+    """Run all stages once. measure(stage, fn) runs fn and records its cost."""
+    rst_text = measure('prescan', lambda: prescan.prune(text, RestProcessor._SECTION_STATE_MAP) if use_prescan else text)
+    doc = measure('parse_rst', lambda: parse_rst('bench.rst', rst_text))
+
+    scanned = _ScannedUml()
+    def scan_diagrams():
+        for node in doc.traverse(uml):
+            if node.is_restuml2code:
+                node.scan_dependencies(scanned)
+    measure('uml', scan_diagrams)
+
+    def walk():
+        processor = RestProcessor(doc, text, uml_cache=scanned)
+        doc.walkabout(processor)
+        return processor._headers
+    headers = measure('walk', walk)
+
+    def render():
+        size = 0
+        for header in headers:
+            if headers[header]['generated']:
+                buf = StringIO()
+                template.render_context(Context(buf, file=header, content=headers[header]))
+                size += len(buf.getvalue())
+        return size
+    return measure('render', render)
+
+def time_stages(text, template, use_prescan):
+    times = {}
+    def measure(stage, fn):
+        start = time.perf_counter()
+        result = fn()
+        times[stage] = time.perf_counter() - start
+        return result
+    run_stages(text, template, measure, use_prescan)
+    return times
+
+def trace_stages(text, template, use_prescan):
+    peaks = {}
+    def measure(stage, fn):
+        tracemalloc.start()
+        try:
+            result = fn()
+            peaks[stage] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return result
+    output_size = run_stages(text, template, measure, use_prescan)
+    return peaks, output_size
+
+def benchmark(size: DocSize, template_path: str, repeat: int, use_prescan: bool = True):
+    register_directives()
+    text = make_document(size)
+    template = load_template(template_path)
+
+    # Warm up the shared UML parser and the template, so that the runs compare the steady state.
+    time_stages(text, template, use_prescan)
+    runs = [ time_stages(text, template, use_prescan) for _ in range(repeat) ]
+    peaks, output_size = trace_stages(text, template, use_prescan)
+
+    stages = {}
+    for stage in STAGES:
+        times = [ r[stage] for r in runs ]
+        stages[stage] = { 'min': min(times), 'median': statistics.median(times), 'times': times,
+                          'peak_memory': peaks[stage] }
+    return {
+        'size': size._asdict(),
+        'document_bytes': len(text),
+        'document_lines': text.count('\n'),
+        'output_bytes': output_size,
+        'stages': stages,
+        'total_median': sum(stages[s]['median'] for s in STAGES),
+    }
+
+def main():
+    parser = ArgumentParser(description="Benchmark the restuml2code stages on synthetic design documents.")
+    add_size_arguments(parser)
+    parser.add_argument("--scale", dest="scale", type=int, action="append",
+                        help="also run with the element counts multiplied by SCALE (may be repeated)")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5, help="timed runs per size (default: %(default)s)")
+    parser.add_argument("-t", "--template", dest="template", default=DEFAULT_TEMPLATE, help="code template to render")
+    parser.add_argument("--no-prescan", dest="no_prescan", help="let docutils parse the whole document",
+                        default=False, action='store_true')
+    parser.add_argument("--json", dest="json", help="write the results to this JSON file")
+    args = vars(parser.parse_args())
+
+    base = size_from_args(args)
+    sizes = [ base ] + [ base.scaled(s) for s in (args['scale'] or []) ]
+
+    results = []
+    for size in sizes:
+        result = benchmark(size, args['template'], args['repeat'], not args['no_prescan'])
+        results.append(result)
+        print("%d lines, %d functions, %d types, %d enums:" % (result['document_lines'], size.functions,
+                                                                size.types, size.enums))
+        for stage in STAGES:
+            s = result['stages'][stage]
+            print("  %-10s %9.2f ms (min %9.2f ms)  peak %8.1f KiB" % (stage, s['median'] * 1000, s['min'] * 1000,
+                                                                      s['peak_memory'] / 1024))
+        print("  %-10s %9.2f ms" % ('total', result['total_median'] * 1000))
+
+    if args['json']:
+        report = {
+            'version': __version__,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args['repeat'],
+            'prescan': not args['no_prescan'],
+            'results': results,
+        }
+        with open(args['json'], 'w') as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Checks that the processing time grows linearly with the size of the design document. The synthetic
+# document is generated at 1x, 10x and 100x its base size, with all element counts, the headers and the
+# global fields multiplied, and the stages of benchmarks/run.py are timed at every size. The growth exponent
+# between two sizes is log(time ratio) / log(document size ratio), 1 for linear growth. The script exits
+# with status 1 if the exponent of the total or of a stage taking at least --min-time exceeds --max-exponent.
+#
+# Usage: python benchmarks/scaling.py [--factor N ...] [--repeat N] [--max-exponent X] [--json results.json]
+
+from argparse import ArgumentParser
+import json
+import math
+import sys
+
+from restuml2code.main import register_directives, load_template
+
+try:
+    from .docgen import DocSize, make_document
+    from .run import STAGES, DEFAULT_TEMPLATE, time_stages
+except:
+    from docgen import DocSize, make_document
+    from run import STAGES, DEFAULT_TEMPLATE, time_stages
+
+BASE_SIZE = DocSize(headers=2, functions=4, types=2, enums=1, macro_constant_groups=1, macro_functions=1,
+                    variable_groups=1, artifacts=4, prose_sections=2, global_fields=2)
+
+def scaled_size(factor: int) -> DocSize:
+    return BASE_SIZE.scaled(factor)._replace(headers=BASE_SIZE.headers * factor)
+
+def measure(factor: int, template, repeat: int):
+    text = make_document(scaled_size(factor))
+    runs = [ time_stages(text, template, True) for _ in range(repeat) ]
+    times = { stage: min(r[stage] for r in runs) for stage in STAGES }
+    times['total'] = min(sum(r.values()) for r in runs)
+    return { 'factor': factor, 'document_bytes': len(text), 'times': times }
+
+def growth_exponent(small, large, stage) -> float:
+    t_small, t_large = small['times'][stage], large['times'][stage]
+    if t_small <= 0 or t_large <= 0:
+        return 0.0
+    return math.log(t_large / t_small) / math.log(large['document_bytes'] / small['document_bytes'])
+
+def main():
+    parser = ArgumentParser(description="Check that restuml2code scales linearly with the document size.")
+    parser.add_argument("--factor", dest="factors", type=int, action="append",
+                        help="size factor to run (may be repeated, default: 1, 10 and 100)")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=3,
+                        help="timed runs per size, the fastest counts (default: %(default)s)")
+    parser.add_argument("--max-exponent", dest="max_exponent", type=float, default=1.25,
+                        help="largest growth exponent accepted (default: %(default)s)")
+    parser.add_argument("--min-time", dest="min_time", type=float, default=0.05,
+                        help="stages taking less seconds at the larger size are not checked (default: %(default)s)")
+    parser.add_argument("-t", "--template", dest="template", default=DEFAULT_TEMPLATE, help="code template to render")
+    parser.add_argument("--json", dest="json", help="write the results to this JSON file")
+    args = vars(parser.parse_args())
+
+    factors = sorted(args['factors'] or [ 1, 10, 100 ])
+    if len(factors) < 2:
+        raise RuntimeError("Error: at least two size factors are needed")
+
+    register_directives()
+    template = load_template(args['template'])
+    # Warm up the shared UML parser and the template.
+    time_stages(make_document(scaled_size(factors[0])), template, True)
+
+    results = []
+    for factor in factors:
+        result = measure(factor, template, args['repeat'])
+        results.append(result)
+        print("%4dx %9.1f KiB:" % (factor, result['document_bytes'] / 1024) +
+              ''.join("  %s %.1f ms" % (stage, result['times'][stage] * 1000) for stage in STAGES + [ 'total' ]))
+
+    failures = []
+    for small, large in zip(results, results[1:]):
+        print("%dx -> %dx growth exponents:" % (small['factor'], large['factor']))
+        for stage in STAGES + [ 'total' ]:
+            exponent = growth_exponent(small, large, stage)
+            checked = stage == 'total' or large['times'][stage] >= args['min_time']
+            failed = checked and exponent > args['max_exponent']
+            print("  %-10s %5.2f%s" % (stage, exponent, '  SUPER-LINEAR' if failed else ('' if checked else '  (not checked)')))
+            if failed:
+                failures.append((small['factor'], large['factor'], stage, exponent))
+
+    if args['json']:
+        with open(args['json'], 'w') as f:
+            json.dump({ 'base_size': BASE_SIZE._asdict(), 'max_exponent': args['max_exponent'],
+                        'results': results, 'failures': failures }, f, indent=2)
+
+    if failures:
+        print("Super-linear growth in: " + ', '.join("%s (%dx -> %dx)" % (s, a, b) for a, b, s, _ in failures))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Measures the startup cost of the command line tool: the import time of the modules every stage
+# needs, each in a fresh interpreter and counting only what the earlier stages did not import yet,
+# and the wall time of whole runs (--help, a run served from the model cache, a full run).
+#
+# Usage: python benchmarks/startup_bench.py [--repeat N] [--json results.json]
+
+from argparse import ArgumentParser
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+try:
+    from .docgen import make_document
+except:
+    from docgen import make_document
+
+TEMPLATE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "template.h")
+
+# Stage -> modules imported on its path, in the order of a generation run.
+STAGES = [
+    ('cli', [ 'restuml2code.main' ]),
+    ('template', [ 'mako.lookup', 'mako.runtime' ]),
+    ('parse_rst', [ 'restuml2code.rstparser', 'docutils.parsers.rst' ]),
+    ('walk', [ 'restuml2code.restprocessor' ]),
+    ('uml', [ 'lark', 'restuml2code.umldependencyscanner' ]),
+    ('batch', [ 'multiprocessing' ]),
+]
+
+_IMPORT_SNIPPET = """
+import importlib, time
+for m in %r:
+    importlib.import_module(m)
+start = time.perf_counter()
+for m in %r:
+    importlib.import_module(m)
+print(time.perf_counter() - start)
+"""
+
+def import_time(preloaded, modules):
+    out = subprocess.run([ sys.executable, '-c', _IMPORT_SNIPPET % (preloaded, modules) ],
+                         check=True, stdout=subprocess.PIPE, universal_newlines=True).stdout
+    return float(out)
+
+def run_time(cmd):
+    start = time.perf_counter()
+    subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def median_of(repeat, fn, *fn_args):
+    return statistics.median(fn(*fn_args) for _ in range(repeat))
+
+def main():
+    parser = ArgumentParser(description="Measure the startup and import time of restuml2code.")
+    parser.add_argument("--repeat", dest="repeat", type=int, default=5, help="runs per measurement (default: %(default)s)")
+    parser.add_argument("--json", dest="json", help="write the results to this JSON file")
+    args = vars(parser.parse_args())
+
+    results = { 'python': sys.version.split()[0], 'imports': {}, 'runs': {} }
+
+    print("Import time per stage (modules not imported by the earlier stages):")
+    preloaded = []
+    for stage, modules in STAGES:
+        t = median_of(args['repeat'], import_time, preloaded, modules)
+        results['imports'][stage] = { 'modules': modules, 'time': t }
+        print("  %-10s %8.2f ms  %s" % (stage, t * 1000, ', '.join(modules)))
+        preloaded = preloaded + modules
+
+    work_dir = tempfile.mkdtemp(prefix='restuml2code-startup')
+    try:
+        input_path = os.path.join(work_dir, 'input.rst')
+        with open(input_path, 'w') as f:
+            f.write(make_document())
+        tool = [ sys.executable, '-m', 'restuml2code' ]
+        common = tool + [ '-i', input_path, '-t', TEMPLATE, '-o', os.path.join(work_dir, 'out'),
+                          '--cache-dir', os.path.join(work_dir, 'cache') ]
+        runs = [
+            ('python', [ sys.executable, '-c', 'pass' ]),
+            ('--help', tool + [ '--help' ]),
+            ('cached model', common),
+            ('full run', common + [ '--no-model-cache', '--no-uml-cache', '--no-template-cache' ]),
+        ]
+        # Fill the caches for the cached model run.
+        run_time(common)
+
+        print("Run time:")
+        for name, cmd in runs:
+            t = median_of(args['repeat'], run_time, cmd)
+            results['runs'][name] = t
+            print("  %-14s %8.2f ms" % (name, t * 1000))
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if args['json']:
+        with open(args['json'], 'w') as f:
+            json.dump(results, f, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+<%!
+    def make_include_guard(file):
+        return file.upper().replace('.', '_')
+%>
+<%def name="render_type(type_item)">
+/** ${type_item['description']} */
+% if type_item['kind'] == 'Typedef':
+typedef ${type_item['type']};
+% elif type_item['kind'] == 'Structure':
+typedef struct {
+% for sel in type_item['elements']:
+    /** ${sel['description']} */
+    ${sel['type']} ${sel['field']};
+% endfor
+} ${type_item['type-name']};
+% elif type_item['kind'] == 'Enumeration':
+typedef enum {
+% for c in type_item['constants']:
+    /** ${c['description']} */
+    ${c['name']}${' = ' + c['value'] if 'value' in c else ''},
+% endfor
+} ${type_item['type-name']};
+% endif
+</%def>
+<%def name="render_function(func_item)">
+/**
+ * ${func_item['description']}
+ *
+% for ipar in func_item['in-params']:
+ * @param[in] ${ipar['name']} - ${ipar['description']}
+% endfor
+ * @return ${func_item['return-value']['type']} - ${func_item['return-value']['description']}
+ */
+${func_item['syntax']};
+</%def>
+/* ${content['description']} */
+
+#ifndef ${make_include_guard(file)}
+#define ${make_include_guard(file)}
+
+% for i in content['includes']:
+#include "${i}"
+% endfor
+
+% for g in content['macro-constants']:
+/* ${g['constants-group']} */
+% for c in g['constants']:
+#define ${c['name']} ${c['value']} /* ${c['description']} */
+% endfor
+
+% endfor
+% for m in content['macro-functions']:
+/** ${m['description']} */
+% for d in m['definition']:
+${d['prepro-conditional']} ${d['condition']}
+${m['syntax']} ${' '.join(d['code'])}
+% endfor
+#endif
+
+% endfor
+% for t in content['types']:
+${render_type(t)}
+% endfor
+% for g in content['variables']:
+/* ${g['variables-group']} */
+% for v in g['variables']:
+/** ${v['description']} */
+extern ${v['syntax']};
+% endfor
+
+% endfor
+% for f in content['functions']:
+${render_function(f)}
+% endfor
+#endif /* ${make_include_guard(file)} */
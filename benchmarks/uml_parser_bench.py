@@ -0,0 +1,84 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Compares the cost of building an Earley parser for every uml block (as restuml2code <= 0.17 did)
+# with the shared LALR parser, with and without building the parse tree. The Earley parser is built from
+# puml-0.17.ebnf, the grammar of restuml2code 0.17, before it was made LALR-compatible, so that the
+# comparison is with the parser of that version.
+#
+# Usage: python benchmarks/uml_parser_bench.py [--blocks N] [--artifacts N]
+
+from argparse import ArgumentParser
+import os
+import time
+from lark import Lark
+
+from restuml2code import uml
+from restuml2code.umldependencyscanner import UmlDependencyScanner
+
+try:
+    from .docgen import make_dependency_diagram
+except:
+    from docgen import make_dependency_diagram
+
+BASELINE_GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), 'puml-0.17.ebnf')
+
+def earley_per_block(blocks):
+    # Read for every block as well, as 0.17 did.
+    for b in blocks:
+        with open(BASELINE_GRAMMAR_FILE) as f:
+            grammar = f.read()
+        scanner = UmlDependencyScanner()
+        scanner.visit_topdown(Lark(grammar, debug=True).parse(b + '\n'))
+
+def lalr_shared_tree(blocks):
+    for b in blocks:
+        scanner = UmlDependencyScanner()
+        scanner.visit_topdown(uml.get_parser().parse(b))
+
+def lalr_shared_scan(blocks):
+    for b in blocks:
+        uml.get_parser(scan_dependencies=True).parse(b)
+
+def timed(fn, blocks):
+    start = time.perf_counter()
+    fn(blocks)
+    return time.perf_counter() - start
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("--blocks", dest="blocks", type=int, default=20, help="number of uml blocks")
+    parser.add_argument("--artifacts", dest="artifacts", type=int, default=20, help="header artifacts per block")
+    args = parser.parse_args()
+
+    blocks = [make_dependency_diagram(args.artifacts)] * args.blocks
+
+    print("%d blocks, %d artifacts each" % (args.blocks, args.artifacts))
+    earley = timed(earley_per_block, blocks)
+    print("Earley, parser built per block:  %8.2f ms" % (earley * 1000))
+
+    # The first call includes building the shared parsers.
+    build = timed(lambda b: (uml.get_parser(), uml.get_parser(scan_dependencies=True)), blocks)
+    print("LALR, building shared parsers:    %8.2f ms" % (build * 1000))
+    tree = timed(lalr_shared_tree, blocks)
+    print("LALR, shared parser + tree:       %8.2f ms  (x%.1f)" % (tree * 1000, earley / tree))
+    scan = timed(lalr_shared_scan, blocks)
+    print("LALR, shared parser, no tree:     %8.2f ms  (x%.1f)" % (scan * 1000, earley / scan))
+
+if __name__ == "__main__":
+    main()
@@ -1 +1 @@
-__version__ = "0.17"
+__version__ = "0.18"
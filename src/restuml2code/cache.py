@@ -0,0 +1,305 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable, Optional, Dict, List, Tuple
+
+try:
+    import fcntl
+except ImportError:
+    # No statistics lock on Windows.
+    fcntl = None
+
+try:
+    from .contentmodel import as_dict, headers_from_dict
+except:
+    from contentmodel import as_dict, headers_from_dict
+
+DEFAULT_CACHE_DIR = os.environ.get('RESTUML2CODE_CACHE_DIR',
+                                   os.path.join(os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+                                                'restuml2code'))
+
+def make_key(*parts) -> str:
+    h = hashlib.sha256()
+    for p in parts:
+        h.update(p.encode('utf-8') if isinstance(p, str) else p)
+        h.update(b'\0')
+    return h.hexdigest()
+
+class FileCache:
+    """Content-addressed cache, one file per key in cache_dir.
+
+    Entries are written atomically, so several processes may share the directory. When the total size
+    grows over max_size bytes, the least recently used entries are removed until it is back under
+    3/4 of max_size, so that eviction does not run on every put.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        self._dir = cache_dir
+        self._max_size = max_size
+        self._size = None
+        # Set when an entry could not be written, the cache is then only read.
+        self._read_only = False
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+        except OSError as e:
+            self._disable(e)
+
+    def _disable(self, e: OSError) -> None:
+        if not self._read_only:
+            print("WARNING: cannot write to the cache " + self._dir + ", continuing without it: " + str(e))
+        self._read_only = True
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self._dir, key)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        try:
+            # The modification time orders the entries for eviction.
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes) -> None:
+        """Store the entry. A cache that cannot be written (read-only or full file system) is never an
+        error: a warning is printed once and the entries are not stored any more."""
+        if self._read_only:
+            return
+        try:
+            self._write(key, data)
+        except OSError as e:
+            self._disable(e)
+
+    def _write(self, key: str, data: bytes) -> None:
+        os.makedirs(self._dir, exist_ok=True)
+        # Created with the permissions of the umask, so that the users sharing the directory can read it.
+        tmp_path = os.path.join(self._dir, '.' + key + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp')
+        try:
+            old_size = os.stat(self._path(key)).st_size
+        except OSError:
+            old_size = 0
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        except:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        if self._size is None:
+            self._size = self._scan_size()
+        else:
+            # An entry written again replaces the old one.
+            self._size += len(data) - old_size
+        if self._size > self._max_size:
+            self._evict()
+
+    def _entries(self):
+        entries = []
+        with os.scandir(self._dir) as it:
+            for e in it:
+                if e.is_file() and self._is_entry(e.name):
+                    try:
+                        st = e.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, e.path))
+        return entries
+
+    def _is_entry(self, name: str) -> bool:
+        return not name.startswith('.')
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def usage(self) -> Tuple[int, int]:
+        """Return the number of entries and their total size."""
+        try:
+            entries = self._entries()
+        except OSError:
+            return 0, 0
+        return len(entries), sum(size for _, size, _ in entries)
+
+    def _evict(self) -> None:
+        entries = sorted(self._entries())
+        self._size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self._size <= self._max_size * 3 // 4:
+                break
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+            self._size -= size
+
+class TemplateModuleCache(FileCache):
+    """Directory of the compiled template modules, kept under the size limit like a FileCache.
+
+    Mako writes the modules, named by main._TemplateModulePath. Using a module marks it as recently used,
+    and the modules of edited templates, which are not used any more, are evicted first.
+    """
+
+    @property
+    def directory(self) -> Optional[str]:
+        """The module directory, None when it cannot be written and the templates are compiled in memory."""
+        return None if self._read_only else self._dir
+
+    def disable(self, e: OSError) -> None:
+        self._disable(e)
+
+    def _is_entry(self, name: str) -> bool:
+        return name.endswith('.py')
+
+    def trim(self) -> None:
+        """Evict the least recently used modules if the directory is over the size limit."""
+        try:
+            self._size = self._scan_size()
+            if self._size > self._max_size:
+                self._evict()
+        except OSError:
+            pass
+
+class MemoryModelCache:
+    """In-process stand-in for ModelCache, keeping the models of the max_entries documents used last."""
+
+    def __init__(self, max_entries: int = 16) -> None:
+        self._models = OrderedDict()
+        self._max_entries = max_entries
+
+    def get(self, text: str, global_overrides: Optional[Dict[str, str]] = None) -> Optional[dict]:
+        key = (text, json.dumps(global_overrides, sort_keys=True))
+        headers = self._models.get(key)
+        if headers is not None:
+            self._models.move_to_end(key)
+        return headers
+
+    def put(self, text: str, global_overrides: Optional[Dict[str, str]], headers: dict) -> None:
+        key = (text, json.dumps(global_overrides, sort_keys=True))
+        self._models[key] = headers
+        self._models.move_to_end(key)
+        while len(self._models) > self._max_entries:
+            self._models.popitem(last=False)
+
+class ModelCache:
+    """On-disk cache of the header models (RestProcessor._headers) of the input documents.
+
+    The key covers the document text and the global field overrides. Everything else the model depends on
+    (tool version, grammar, registered directives and roles) is passed in the salt, a function called
+    on the first lookup, so that runs not parsing any document do not work it out.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int, salt: Callable[[], str]) -> None:
+        self._cache = FileCache(cache_dir, max_size)
+        self._get_salt = salt
+        self._salt = None
+
+    def _key(self, text: str, global_overrides: Optional[Dict[str, str]]) -> str:
+        if self._salt is None:
+            self._salt = self._get_salt()
+        return make_key(self._salt, json.dumps(global_overrides, sort_keys=True), text)
+
+    def get(self, text: str, global_overrides: Optional[Dict[str, str]] = None) -> Optional[dict]:
+        data = self._cache.get(self._key(text, global_overrides))
+        if data is None:
+            return None
+        return headers_from_dict(json.loads(data))
+
+    def put(self, text: str, global_overrides: Optional[Dict[str, str]], headers: dict) -> None:
+        self._cache.put(self._key(text, global_overrides), json.dumps(headers, default=as_dict).encode('utf-8'))
+
+class OutputCache:
+    """Cache of the generated files, in the manner of ccache.
+
+    The key covers everything the files of an input depend on (see main.output_cache_key()). The entry
+    holds the texts of all files generated from the input, so that a hit writes them without parsing
+    or rendering. Parallel builds may share the directory: entries are written atomically and the
+    statistics are updated under a file lock.
+    """
+
+    _STATS_FILE = '.stats'
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        self._dir = cache_dir
+        self._max_size = max_size
+        self._cache = FileCache(cache_dir, max_size)
+
+    def get(self, key: str) -> Optional[dict]:
+        data = self._cache.get(key)
+        entry = None
+        if data is not None:
+            try:
+                entry = json.loads(data)
+            except ValueError:
+                pass
+        self._count('hits' if entry is not None else 'misses')
+        return entry
+
+    def put(self, key: str, outputs: List[Tuple[str, str]], skipped: int) -> None:
+        """Store the (output file name, text) of the generated files and the number of skipped headers."""
+        self._cache.put(key, json.dumps({ 'outputs': outputs, 'skipped': skipped }).encode('utf-8'))
+
+    def _count(self, name: str) -> None:
+        # The statistics are not worth failing a build for, they stop with the cache writes.
+        if self._cache._read_only:
+            return
+        try:
+            os.makedirs(self._dir, exist_ok=True)
+            with open(os.path.join(self._dir, self._STATS_FILE), 'a+') as f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                f.seek(0)
+                try:
+                    stats = json.loads(f.read())
+                except ValueError:
+                    stats = {}
+                stats[name] = stats.get(name, 0) + 1
+                f.seek(0)
+                f.truncate()
+                f.write(json.dumps(stats))
+        except OSError as e:
+            self._cache._disable(e)
+
+    def stats(self) -> dict:
+        try:
+            with open(os.path.join(self._dir, self._STATS_FILE), 'r') as f:
+                stats = json.loads(f.read())
+        except (OSError, ValueError):
+            stats = {}
+        entries, size = self._cache.usage()
+        return { 'hits': stats.get('hits', 0), 'misses': stats.get('misses', 0), 'entries': entries,
+                 'size': size, 'max_size': self._max_size }
+
+    def print_stats(self) -> None:
+        stats = self.stats()
+        lookups = stats['hits'] + stats['misses']
+        print("Output cache " + self._dir + ":")
+        print("  hits:     %d (%.1f %%)" % (stats['hits'], 100.0 * stats['hits'] / lookups if lookups > 0 else 0.0))
+        print("  misses:   %d" % stats['misses'])
+        print("  entries:  %d" % stats['entries'])
+        print("  size:     %.1f of %.1f MB" % (stats['size'] / (1024 * 1024), stats['max_size'] / (1024 * 1024)))
@@ -0,0 +1,295 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# The elements of the header model (see model.txt). They keep their attributes in __slots__ instead of
+# a dict per element, but are accessed like the dicts they replace (func_item['in-params'],
+# 'value' in c, c.get('value')), so the templates do not see a difference. Keys outside the layout of
+# an element are kept in a dict created on the first such key. The global fields of the document are
+# not copied into every header, the headers share one dict of them.
+#
+# Derived keys (_DERIVED), e.g. the 'brief' of a function or the 'include-guard' and 'public-functions'
+# of a header, are computed from the other keys when they are looked up. Like the keys a dict's __missing__
+# provides, they are not stored: they are left out of iteration, len(), 'in' and the JSON form, so the model
+# caches and model files do not hold them. They are computed on every lookup, so that they follow the lists
+# a template changes in place, and every lookup of a list gets a new one. The string functions of helpers.py
+# they use are memoized.
+#
+# The elements are not JSON serializable by themselves, use json.dumps(..., default=as_dict).
+
+from collections.abc import MutableMapping
+
+try:
+    from .helpers import make_include_guard, get_brief, public, private, sorted_includes
+except:
+    from helpers import make_include_guard, get_brief, public, private, sorted_includes
+
+class Element(MutableMapping):
+    """Base of the model elements. _KEYS lists the keys held in slots, in the order of iteration."""
+
+    _KEYS = ()
+    _SLOTS = {}
+    _FIELDS = ()
+    # Element class of the values (or list items) of a key, for from_dict().
+    _ITEM_TYPES = {}
+    # Functions computing the derived keys from the element.
+    _DERIVED = {}
+
+    __slots__ = ('_extra',)
+
+    def __init_subclass__(cls, **kwargs) -> None:
+        super().__init_subclass__(**kwargs)
+        cls._SLOTS = { key: key.replace('-', '_') for key in cls._KEYS }
+        cls._FIELDS = tuple(cls._SLOTS.items())
+        assert tuple(cls._SLOTS.values()) == tuple(s for s in cls.__slots__ if not s.startswith('_')), \
+            cls.__name__ + ": __slots__ do not match _KEYS"
+
+    def __init__(self, **fields) -> None:
+        """Fields are passed by slot name, e.g. Definition(prepro_conditional='#if')."""
+        self._extra = None
+        for slot, value in fields.items():
+            setattr(self, slot, value)
+
+    def __getitem__(self, key):
+        # Checked in turn rather than by catching KeyError, the templates look up extra keys (the global
+        # fields) as often as the others.
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        return self._missing(key)
+
+    def _missing(self, key):
+        """Return the value of a key the element does not hold, i.e. of a derived key."""
+        derive = self._DERIVED.get(key)
+        if derive is None:
+            raise KeyError(key)
+        return derive(self)
+
+    def __setitem__(self, key, value) -> None:
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            setattr(self, slot, value)
+        else:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+
+    def __delitem__(self, key) -> None:
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                delattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key) -> bool:
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            return hasattr(self, slot)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key, slot in self._FIELDS:
+            if hasattr(self, slot):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        n = sum(1 for _, slot in self._FIELDS if hasattr(self, slot))
+        return n if self._extra is None else n + len(self._extra)
+
+    def __repr__(self) -> str:
+        return type(self).__name__ + '(' + repr(dict(self)) + ')'
+
+    @classmethod
+    def from_dict(cls, d: dict) -> 'Element':
+        """Build the element from the plain dicts of a JSON model."""
+        elem = cls()
+        for key, value in d.items():
+            item_type = cls._ITEM_TYPES.get(key)
+            if item_type is not None:
+                if isinstance(value, list):
+                    value = [ item_type.from_dict(v) for v in value ]
+                else:
+                    value = item_type.from_dict(value)
+            elem[key] = value
+        return elem
+
+def _brief(elem) -> str:
+    return get_brief(elem['description'])
+
+def as_dict(obj) -> dict:
+    """json.dumps() default for the model elements."""
+    if isinstance(obj, Element):
+        return dict(obj)
+    raise TypeError("Object of type " + type(obj).__name__ + " is not JSON serializable")
+
+class Parameter(Element):
+    _KEYS = ('name', 'description')
+    __slots__ = ('name', 'description')
+
+class ReturnValue(Element):
+    _KEYS = ('type', 'description')
+    __slots__ = ('type', 'description')
+
+class StructElement(Element):
+    _KEYS = ('type', 'field', 'description')
+    __slots__ = ('type', 'field', 'description')
+
+class Constant(Element):
+    """A constant of an enumeration or of a macro constants group."""
+    _KEYS = ('name', 'value', 'description')
+    __slots__ = ('name', 'value', 'description')
+
+class Variable(Element):
+    _KEYS = ('description', 'syntax')
+    __slots__ = ('description', 'syntax')
+
+class Definition(Element):
+    """A conditional definition of a function-like macro."""
+    _KEYS = ('condition', 'prepro-conditional', 'code')
+    __slots__ = ('condition', 'prepro_conditional', 'code')
+
+class Function(Element):
+    _KEYS = ('function-name', 'description', 'syntax', 'header', 'allowed-from-isr', 'is-reentrant',
+             'return-value', 'in-params', 'out-params', 'inout-params', 'call-cycle-interval', 'private')
+    _ITEM_TYPES = { 'return-value': ReturnValue, 'in-params': Parameter, 'out-params': Parameter,
+                    'inout-params': Parameter }
+    _DERIVED = { 'brief': _brief }
+    __slots__ = ('function_name', 'description', 'syntax', 'header', 'allowed_from_isr', 'is_reentrant',
+                 'return_value', 'in_params', 'out_params', 'inout_params', 'call_cycle_interval', 'private')
+
+class MacroFunction(Element):
+    _KEYS = ('identifier-name', 'description', 'syntax', 'header', 'allowed-from-isr', 'is-reentrant',
+             'return-value', 'in-params', 'out-params', 'inout-params', 'definition', 'call-cycle-interval',
+             'private')
+    _ITEM_TYPES = { 'return-value': ReturnValue, 'in-params': Parameter, 'out-params': Parameter,
+                    'inout-params': Parameter, 'definition': Definition }
+    _DERIVED = { 'brief': _brief }
+    __slots__ = ('identifier_name', 'description', 'syntax', 'header', 'allowed_from_isr', 'is_reentrant',
+                 'return_value', 'in_params', 'out_params', 'inout_params', 'definition', 'call_cycle_interval',
+                 'private')
+
+class Type(Element):
+    _KEYS = ('type-name', 'description', 'kind', 'header', 'type', 'elements', 'constants', 'private')
+    _ITEM_TYPES = { 'elements': StructElement, 'constants': Constant }
+    _DERIVED = { 'brief': _brief }
+    __slots__ = ('type_name', 'description', 'kind', 'header', 'type', 'elements', 'constants', 'private')
+
+class MacroConstantsGroup(Element):
+    _KEYS = ('constants-group', 'header', 'constants', 'private')
+    _ITEM_TYPES = { 'constants': Constant }
+    __slots__ = ('constants_group', 'header', 'constants', 'private')
+
+class VariablesGroup(Element):
+    _KEYS = ('variables-group', 'header', 'variables', 'private')
+    _ITEM_TYPES = { 'variables': Variable }
+    __slots__ = ('variables_group', 'header', 'variables', 'private')
+
+def _partitions(keys) -> dict:
+    """Derived keys 'public-<key>' and 'private-<key>' of the lists of a header."""
+    derived = {}
+    for key in keys:
+        derived['public-' + key] = lambda header, key=key: public(header[key])
+        derived['private-' + key] = lambda header, key=key: private(header[key])
+    return derived
+
+class Header(Element):
+    """The model of one header file. The global fields of the document are extra keys, looked up in the
+    dict shared by all headers (share_fields()) after the header's own keys."""
+    _KEYS = ('functions', 'types', 'variables', 'macro-constants', 'macro-functions', 'includes',
+             'file-name', 'description', 'generated')
+    _ITEM_TYPES = { 'functions': Function, 'types': Type, 'variables': VariablesGroup,
+                    'macro-constants': MacroConstantsGroup, 'macro-functions': MacroFunction }
+    _DERIVED = { 'include-guard': lambda header: make_include_guard(header['file-name']),
+                 'brief': _brief,
+                 'sorted-includes': lambda header: sorted_includes(header['includes']),
+                 **_partitions(('functions', 'types', 'variables', 'macro-constants', 'macro-functions')) }
+    __slots__ = ('functions', 'types', 'variables', 'macro_constants', 'macro_functions', 'includes',
+                 'file_name', 'description', 'generated', '_shared')
+
+    def __init__(self, file_name: str = '') -> None:
+        super().__init__()
+        self._shared = None
+        self.functions = []
+        self.types = []
+        self.variables = []
+        self.macro_constants = []
+        self.macro_functions = []
+        self.includes = []
+        self.file_name = file_name
+        self.description = ''
+        self.generated = False
+
+    def share_fields(self, fields: dict) -> None:
+        """Give the header the fields of a dict shared with other headers. Keys set on the header
+        itself take precedence and do not change the shared dict."""
+        self._shared = fields
+
+    def __getitem__(self, key):
+        # Element.__getitem__ with the shared fields looked up before _missing(), which the global fields
+        # of every template would otherwise go through.
+        slot = self._SLOTS.get(key)
+        if slot is not None:
+            try:
+                return getattr(self, slot)
+            except AttributeError:
+                raise KeyError(key) from None
+        extra = self._extra
+        if extra is not None and key in extra:
+            return extra[key]
+        shared = self._shared
+        if shared is not None and key in shared:
+            return shared[key]
+        return self._missing(key)
+
+    def __delitem__(self, key) -> None:
+        if self._shared is not None and key in self._shared:
+            # Take a copy of the shared fields before deleting one of them.
+            shared, self._shared = self._shared, None
+            for k, v in shared.items():
+                if self._extra is None or k not in self._extra:
+                    self[k] = v
+        super().__delitem__(key)
+
+    def __contains__(self, key) -> bool:
+        return super().__contains__(key) or (self._shared is not None and key in self._shared)
+
+    def __iter__(self):
+        yield from super().__iter__()
+        if self._shared is not None:
+            for key in self._shared:
+                if self._extra is None or key not in self._extra:
+                    yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+def headers_from_dict(headers: dict) -> dict:
+    """Build the header model from the plain dicts of a JSON model (model cache, model file)."""
+    return { name: Header.from_dict(header) for name, header in headers.items() }
@@ -0,0 +1,96 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Dependency files in the format of gcc -MD, read by Make (include) and Ninja (depfile = ...):
+#
+#   out/Det.h out/Det_Types.h: design.rst templates/header.h templates/common.mako .../__init__.py ... .../puml.ebnf
+#
+# The dependencies are the input, the templates with the templates they include, inherit or import
+# as namespaces, the source files of the tool and the UML grammar.
+
+import os
+import re
+from typing import List, Optional
+
+try:
+    from .umlparser import _GRAMMAR_FILE
+except:
+    from umlparser import _GRAMMAR_FILE
+
+_PACKAGE_DIR = os.path.dirname(os.path.realpath(__file__))
+
+# Template files named by <%include>, <%inherit> and <%namespace> tags. Names computed by expressions
+# cannot be followed.
+_TEMPLATE_REFERENCE = re.compile(r'<%(?:include|inherit|namespace)\b[^>]*?\bfile\s*=\s*(["\'])([^"\'$]+)\1')
+
+def template_dependencies(path: str) -> List[str]:
+    """Return the template file and the files it refers to, recursively. The uris are resolved as
+    by the template lookup of the template directory."""
+    lookup_dir = os.path.dirname(os.path.abspath(path))
+    files = []
+    pending = [ os.path.abspath(path) ]
+    while len(pending) > 0:
+        file = pending.pop()
+        if file in files or not os.path.isfile(file):
+            continue
+        files.append(file)
+        with open(file, 'r', encoding='utf-8') as f:
+            source = f.read()
+        for m in _TEMPLATE_REFERENCE.finditer(source):
+            uri = m.group(2)
+            if uri.startswith('/'):
+                pending.append(os.path.normpath(os.path.join(lookup_dir, uri[1:])))
+            else:
+                pending.append(os.path.normpath(os.path.join(os.path.dirname(file), uri)))
+    return files
+
+def source_files() -> List[str]:
+    """Return the Python source files of the tool."""
+    return sorted(os.path.join(_PACKAGE_DIR, name) for name in os.listdir(_PACKAGE_DIR) if name.endswith('.py'))
+
+def tool_dependencies(parses_rst: bool = True) -> List[str]:
+    """Return the files of the tool the outputs depend on."""
+    files = source_files()
+    if parses_rst:
+        files.append(os.path.abspath(_GRAMMAR_FILE))
+    return files
+
+def _escape(path: str) -> str:
+    return path.replace('\\', '\\\\').replace(' ', '\\ ').replace('#', '\\#').replace('$', '$$')
+
+def make_rule(targets: List[str], dependencies: List[str], phony: bool = False) -> str:
+    """Return the Make rule of the targets. With phony every dependency gets an empty rule of its own,
+    as with gcc -MP, so that Make does not fail when one is deleted."""
+    deps = []
+    for d in dependencies:
+        if d not in deps:
+            deps.append(d)
+    lines = [ ' '.join(_escape(t) for t in targets) + ':' + ''.join(' \\\n  ' + _escape(d) for d in deps) ]
+    if phony:
+        lines += [ '\n' + _escape(d) + ':' for d in deps[1:] ]
+    return '\n'.join(lines) + '\n'
+
+def depfile_content(input: str, templates: List[str], outputs: List[str], target: Optional[str] = None,
+                    from_model: bool = False, phony: bool = False) -> str:
+    """Return the dependency file of the outputs generated from input with the templates. target replaces
+    the outputs as the target of the rule."""
+    dependencies = [ input ]
+    for t in templates:
+        dependencies += template_dependencies(t)
+    dependencies += tool_dependencies(not from_model)
+    return make_rule([ target ] if target is not None else outputs, dependencies, phony)
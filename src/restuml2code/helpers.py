@@ -0,0 +1,60 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Functions for the code templates, imported in a module-level block of the template:
+#
+#   <%! from restuml2code.helpers import make_include_guard, get_brief, get_group %>
+#
+# The string functions are memoized, so the same description or file name is worked out once per
+# process however many templates and headers use it. The header model offers their results as derived
+# keys as well (see contentmodel.py): content['include-guard'], func_item['brief'], ...
+
+from functools import lru_cache
+
+@lru_cache(maxsize=4096)
+def make_include_guard(file: str) -> str:
+    """Return the include guard macro name of a header file name: 'CanSM_Types.h' -> 'CANSM_TYPES_H'."""
+    return file.upper().replace('.', '_')
+
+@lru_cache(maxsize=4096)
+def get_brief(descr: str) -> str:
+    """Return the first sentence of a description, without the full stop. A description without a
+    full stop is returned as is."""
+    end = descr.find('.')
+    return descr if end < 0 else descr[:end]
+
+def get_group(content, item) -> str:
+    """Return the Doxygen group of a model element of the header content: the module, or the module's
+    private group for the elements of private sections."""
+    return content['module'] if not item['private'] else content['module'] + 'Private'
+
+def get_enum_initializer(item) -> str:
+    """Return the initializer of an enumeration constant, ' = value', or '' if it has no value."""
+    return ' = ' + item['value'] if 'value' in item else ''
+
+def public(items) -> list:
+    """Return the elements of a list of the header model that are not in private sections."""
+    return [ item for item in items if not item.get('private', False) ]
+
+def private(items) -> list:
+    """Return the elements of a list of the header model that are in private sections."""
+    return [ item for item in items if item.get('private', False) ]
+
+def sorted_includes(includes) -> list:
+    """Return the included file names sorted, without duplicates."""
+    return sorted(set(includes))
@@ -0,0 +1,99 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import fnmatch
+import os
+import threading
+from typing import NamedTuple, Optional, Dict, List, Tuple
+
+class TemplateSpec(NamedTuple):
+    path: str
+    # Output file name. {header} stands for the header name, {name} and {ext} for its name and extension.
+    output: str = '{header}'
+    # Glob pattern selecting the generated headers the template renders, all of them when None.
+    filter: Optional[str] = None
+
+    def renders(self, header: str) -> bool:
+        return self.filter is None or fnmatch.fnmatchcase(header, self.filter)
+
+    def output_name(self, header: str) -> str:
+        name, ext = os.path.splitext(header)
+        return self.output.replace('{header}', header).replace('{name}', name).replace('{ext}', ext)
+
+def conflicting_templates(templates: List[TemplateSpec]) -> Optional[Tuple[TemplateSpec, TemplateSpec]]:
+    """Return two of the templates that write the same output files, having the same output pattern and
+    filters selecting the same headers, or None. Other overlaps show only with the headers of the input."""
+    for n, a in enumerate(templates):
+        for b in templates[n + 1:]:
+            if a.output == b.output and (a.filter is None or b.filter is None or a.filter == b.filter):
+                return a, b
+    return None
+
+def parse_template_spec(spec: str, base_dir: str = '') -> TemplateSpec:
+    """Parse 'TEMPLATE[,output=PATTERN][,filter=GLOB]'. A relative template path is taken relative to base_dir."""
+    parts = spec.split(',')
+    options = {}
+    for part in parts[1:]:
+        key, sep, value = part.partition('=')
+        if not sep or key.strip() not in TemplateSpec._fields[1:]:
+            raise RuntimeError("Error: invalid template option '" + part + "' in '" + spec +
+                               "', expected output=PATTERN or filter=GLOB")
+        options[key.strip()] = value.strip()
+    return TemplateSpec(os.path.join(base_dir, parts[0]), **options)
+
+class Job(NamedTuple):
+    input: str
+    # The templates rendering the headers, none when the model is only exported.
+    templ: List[TemplateSpec]
+    odir: Optional[str]
+    # Global fields overriding the ones from the input document.
+    globals: Optional[Dict[str, str]] = None
+
+class JobResult(NamedTuple):
+    job: Job
+    ok: bool
+    # All generated files, whether written or left unchanged.
+    outputs: List[str] = []
+    written: int = 0
+    unchanged: int = 0
+    skipped: int = 0
+    log: str = ''
+    # Profile of the job when run in a worker process with --profile, see Profiler.to_dict().
+    profile: Optional[dict] = None
+
+class OutputClaims:
+    """The output files claimed by the jobs of a run, so that a job does not overwrite the files of another
+    one sharing its output directory. With a process pool, files and lock are the proxies of a
+    multiprocessing manager."""
+
+    def __init__(self, files=None, lock=None) -> None:
+        self._files = files if files is not None else {}
+        self._lock = lock if lock is not None else threading.Lock()
+
+    def claim(self, job: Job, outputs: List[str]) -> None:
+        """Claim the output files of the job. Raises RuntimeError if another job claimed one of them."""
+        owner = repr(job)
+        paths = [ os.path.abspath(path) for path in outputs ]
+        with self._lock:
+            for path in paths:
+                claimed = self._files.get(path)
+                if claimed is not None and claimed[0] != owner:
+                    raise RuntimeError("Error: " + path + " is written for both " + claimed[1] + " and " +
+                                       job.input + ", give the inputs different output directories")
+            for path in paths:
+                self._files[path] = (owner, job.input)
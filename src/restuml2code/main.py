@@ -16,152 +16,858 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-import docutils.nodes
-import docutils.parsers.rst
-import docutils.utils
-import docutils.frontend
-from docutils.parsers.rst import Directive, directives, roles
+import time
+# Time from here to the end of the imports, reported by --profile as the import stage.
+_import_start = time.perf_counter()
+
+# Only light modules are imported here. docutils, Mako, Lark and multiprocessing are imported
+# on the paths that need them, so that e.g. --help or a run served from the model cache start fast.
 from argparse import ArgumentParser
 import json
-from mako.template import Template
-from mako.runtime import Context
-from mako import exceptions
 from io import StringIO
-import pkg_resources
+from contextlib import redirect_stdout
+from typing import NamedTuple, Optional, List, Iterator, Tuple
+import threading
+import traceback
+import glob
+import sys
 import os
 
 try:
-    from .restprocessor import RestProcessor
-    from .uml import uml
-    from .item import item
+    from .umlparser import UmlScanCache, get_grammar
+    from .cache import DEFAULT_CACHE_DIR, ModelCache, MemoryModelCache, OutputCache, TemplateModuleCache, make_key
+    from .watch import FileWatcher
+    from . import __version__
+    from .job import Job, JobResult, TemplateSpec, OutputClaims, parse_template_spec, conflicting_templates
+    from . import manifest
+    from . import profiling
+    from . import modelfile
+    from . import prescan
+    from . import depfile
+    from .contentmodel import as_dict
 except:
-    from restprocessor import RestProcessor
-    from uml import uml
-    from item import item
+    from umlparser import UmlScanCache, get_grammar
+    from cache import DEFAULT_CACHE_DIR, ModelCache, MemoryModelCache, OutputCache, TemplateModuleCache, make_key
+    from watch import FileWatcher
+    from __init__ import __version__
+    from job import Job, JobResult, TemplateSpec, OutputClaims, parse_template_spec, conflicting_templates
+    import manifest
+    import profiling
+    import modelfile
+    import prescan
+    import depfile
+    from contentmodel import as_dict
 
-class UmlDirective(Directive):
+_import_time = time.perf_counter() - _import_start
 
-    required_arguments = 0
-    optional_arguments = 0
-    final_argument_whitespace = True
-    option_spec = {}
-    has_content = True
+def _rstparser():
+    try:
+        from . import rstparser
+    except:
+        import rstparser
+    return rstparser
 
-    node_class = uml
+def parse_rst(srcpath: str, text: str) -> 'docutils.nodes.document':
+    register_directives()
+    return _rstparser().parse_rst(srcpath, text)
 
-    def run(self):
-        self.assert_has_content()
-        text = '\n'.join(self.content)
-        uml_node = self.node_class(rawsource=text)
-        return [uml_node]
+sphinx_roles = ['ref', 'any', 'doc', 'download', 'numref', 'envvar', 'token', 'keyword', 'option', 'term',
+                'math', 'eq', 'abbr', 'command', 'dfn', 'file', 'guilabel', 'kbd', 'mailheader', 'makevar', 'manpage',
+                'menuselection', 'mimetype', 'newsgroup', 'program', 'regexp', 'samp', 'pep', 'rfc' ]
 
-class ItemDirective(Directive):
+# Directive name -> directive class in rstparser.
+_directives = { 'uml': 'UmlDirective', 'item': 'ItemDirective', 'todo': 'IgnoredDirective' }
 
-    required_arguments = 1
-    optional_arguments = 0
-    final_argument_whitespace = True
-    option_spec = {}
-    has_content = False
+_directives_registered = False
 
-    node_class = item
+def register_directives():
+    global _directives_registered
+    if _directives_registered:
+        return
+    from docutils.parsers.rst import directives, roles
+    rstparser = _rstparser()
+    for name, class_name in _directives.items():
+        directives.register_directive(name, getattr(rstparser, class_name))
 
-    def run(self):
-        text = '\n'.join(self.content)
-        item_node = self.node_class(rawsource=text)
-        # Parse the directive contents.
-        self.state.nested_parse(self.content, self.content_offset, item_node)
-        return [ item_node ]
+    # Prevent the 'Unknown interpreted text role' errors from docutils parser.
+    for role in sphinx_roles:
+        roles.register_local_role(role, rstparser.sphinx_role_fn)
+    _directives_registered = True
 
-class IgnoredDirective(Directive):
+# Compiled templates and template lookups, shared by all jobs run in the process.
+_templates = {}
+_lookups = {}
 
-    required_arguments = 0
-    optional_arguments = 0
-    final_argument_whitespace = True
-    option_spec = {}
-    has_content = True
+def _normalize_newlines(text):
+    return text.replace('\r\n', '\n')
 
-    def run(self):
-        return []
+class _TemplateModulePath:
+    """Name the compiled module of a template after its path and content, so that an edited template
+    is never served from a stale module, whatever its modification time."""
 
-def parse_rst(srcpath: str, text: str) -> docutils.nodes.document:
-    parser = docutils.parsers.rst.Parser()
-    components = (docutils.parsers.rst.Parser,)
-    settings = docutils.frontend.OptionParser(components=components).get_default_values()
-    document = docutils.utils.new_document(srcpath, settings=settings)
-    parser.parse(text, document)
-    return document
+    def __init__(self, module_directory):
+        self._module_directory = module_directory
 
-def sphinx_role_fn(name, rawtext, text, lineno, inliner, options={}, content=[]):
-    return [], []
+    def __call__(self, filename, uri):
+        with open(filename, 'rb') as f:
+            key = make_key(__version__, os.path.abspath(filename), f.read())
+        path = os.path.join(self._module_directory, key + '.py')
+        if os.path.exists(path):
+            # Most recently used modules are evicted last, see TemplateModuleCache.
+            try:
+                os.utime(path)
+            except OSError:
+                pass
+        return path
 
-sphinx_roles = ['ref', 'any', 'doc', 'download', 'numref', 'envvar', 'token', 'keyword', 'option', 'term',
-                'math', 'eq', 'abbr', 'command', 'dfn', 'file', 'guilabel', 'kbd', 'mailheader', 'makevar', 'manpage',
-                'menuselection', 'mimetype', 'newsgroup', 'program', 'regexp', 'samp', 'pep', 'rfc' ]
+def get_template_lookup(templ_dir: str, module_directory: Optional[str] = None) -> 'TemplateLookup':
+    """Return the lookup for the templates in templ_dir, which also resolves their <%include> and <%inherit> tags.
 
-def main():
-    print("restuml2code version ", pkg_resources.get_distribution('restuml2code').version)
-    parser = ArgumentParser()
-    parser.add_argument("-i", "--input", dest="input", help="rst input file", metavar="INPUT-FILE", required=True)
-    parser.add_argument("-t", "--template", dest="templ", help="header template", metavar="TEMPLATE", required=True)
-    parser.add_argument("-o", "--odir", dest="odir", help="rst input file", metavar="OUTPUT-DIR", required=True)
-    parser.add_argument("-d", "--dump", dest="dump", help="dump content dictionary", default=False, required=False, action='store_true')
-    parser.add_argument("-v", "--verbose", dest="verbose", help="Be more articulate about what is going on",
-                        default=False, required=False, action='store_true')
+    With module_directory the compiled template modules are kept there and reused by later runs.
+    """
+    key = (templ_dir, module_directory)
+    if key not in _lookups:
+        from mako.lookup import TemplateLookup
+        _lookups[key] = TemplateLookup(directories=[templ_dir], input_encoding='utf-8',
+                                       preprocessor=_normalize_newlines,
+                                       module_directory=module_directory,
+                                       modulename_callable=_TemplateModulePath(module_directory) if module_directory else None)
+    return _lookups[key]
 
-    args = vars(parser.parse_args())
+def load_template(path: str, verbose=False, module_cache: Optional[TemplateModuleCache] = None) -> 'Template':
+    """Return the compiled template. With module_cache the compiled modules are kept in its directory,
+    unless it cannot be written, then the template is compiled in memory."""
+    path = os.path.abspath(path)
+    if path not in _templates:
+        if verbose:
+            print("Analyzing code template...")
+        module_directory = module_cache.directory if module_cache is not None else None
+        try:
+            lookup = get_template_lookup(os.path.dirname(path), module_directory)
+            _templates[path] = lookup.get_template('/' + os.path.basename(path))
+        except OSError as e:
+            if module_directory is None:
+                raise
+            module_cache.disable(e)
+            lookup = get_template_lookup(os.path.dirname(path), None)
+            _templates[path] = lookup.get_template('/' + os.path.basename(path))
+        if module_cache is not None and module_cache.directory is not None:
+            module_cache.trim()
+    return _templates[path]
 
-    directives.register_directive('uml', UmlDirective)
-    directives.register_directive('item', ItemDirective)
-    directives.register_directive('todo', IgnoredDirective)
+def forget_template(path: str) -> None:
+    """Drop the template, so that the next load_template() checks the file again."""
+    _templates.pop(os.path.abspath(path), None)
 
-    # Prevent the 'Unknown interpreted text role' errors from docutils parser.
-    for role in sphinx_roles:
-        roles.register_local_role(role, sphinx_role_fn)
+def template_files(path: str) -> List[str]:
+    """Return the file of the template and of the templates it included, as far as they were loaded yet."""
+    files = [os.path.abspath(path)]
+    for lookup_dirs, lookup in _lookups.items():
+        if lookup_dirs[0] == os.path.dirname(files[0]):
+            for t in lookup._collection.values():
+                if t.filename is not None and os.path.abspath(t.filename) not in files:
+                    files.append(os.path.abspath(t.filename))
+    return files
+
+class Caches(NamedTuple):
+    uml: Optional[UmlScanCache] = None
+    model: Optional[ModelCache] = None
+    # Directory of the compiled template modules.
+    templates: Optional[TemplateModuleCache] = None
+    output: Optional[OutputCache] = None
+
+def _package_version(name: str) -> str:
+    """Return the installed version of a distribution, read from its metadata without importing it."""
+    try:
+        from importlib.metadata import version, PackageNotFoundError
+    except ImportError:
+        # Python 3.6 and 3.7.
+        import pkg_resources
+        try:
+            return pkg_resources.get_distribution(name).version
+        except pkg_resources.DistributionNotFound:
+            return 'unknown'
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return 'unknown'
+
+def _sources_key() -> str:
+    """Return the key of the content of the tool's source files, so that an edited tool, whatever its
+    version, does not use the cache entries of the old one."""
+    parts = []
+    for path in depfile.source_files():
+        with open(path, 'rb') as f:
+            parts += [ os.path.basename(path), f.read() ]
+    return make_key(*parts)
+
+_salts = {}
+
+def model_cache_salt(prescan: bool = True) -> str:
+    """Everything besides the document text the parsed model depends on. The versions of docutils and
+    Mako are part of it as well, the output cache key includes the salt. Worked out on first use, and
+    without importing docutils or Mako, so that runs served from the output cache do not load them."""
+    if prescan not in _salts:
+        _salts[prescan] = '\0'.join([__version__, _sources_key(), 'docutils ' + _package_version('docutils'),
+                                     'mako ' + _package_version('Mako'), get_grammar(),
+                                     'prescan' if prescan else 'no-prescan'] +
+                                    [d + '=' + c for d, c in sorted(_directives.items())] + sorted(sphinx_roles))
+    return _salts[prescan]
 
-    with open(args['templ'], 'r') as f:
-        templ_str = f.read()
+def make_caches(args) -> Caches:
+    """Set up the caches enabled by the options."""
+    uml_cache = None
+    if not args['no_uml_cache']:
+        uml_cache = UmlScanCache(os.path.join(args['cache_dir'], 'uml'), args['uml_cache_size'] * 1024 * 1024)
+    model_cache = None
+    if not args['no_model_cache']:
+        model_cache = ModelCache(os.path.join(args['cache_dir'], 'models'), args['model_cache_size'] * 1024 * 1024,
+                                 lambda: model_cache_salt(not args['no_prescan']))
+    template_modules = None
+    if not args['no_template_cache']:
+        template_modules = TemplateModuleCache(os.path.join(args['cache_dir'], 'templates'),
+                                               args['template_cache_size'] * 1024 * 1024)
+    output_cache = None
+    if args['output_cache'] is not None:
+        output_cache = OutputCache(args['output_cache'], args['output_cache_size'] * 1024 * 1024)
+    return Caches(uml_cache, model_cache, template_modules, output_cache)
 
+def output_cache_key(job: Job, args) -> str:
+    """Return the output cache key of the job: the input, the templates and the files they include,
+    the output names, the global field overrides and everything the model depends on. The directories
+    of the input, the templates and the outputs are left out, so that builds in other places share
+    the entries."""
+    with open(job.input, 'rb') as f:
+        parts = [ model_cache_salt(not args['no_prescan']), 'from-model' if args['from_model'] else 'rst',
+                  json.dumps(job.globals, sort_keys=True), f.read() ]
+    for t in job.templ:
+        parts += [ t.output, t.filter or '' ]
+        base = os.path.dirname(os.path.abspath(t.path))
+        for path in depfile.template_dependencies(t.path):
+            with open(path, 'rb') as f:
+                parts += [ os.path.relpath(path, base), f.read() ]
+    return make_key(*parts)
+
+def write_cached_outputs(job: Job, entry: dict, args, claims: Optional[OutputClaims] = None) -> JobResult:
+    """Write the files of an output cache entry, as generate() would have."""
     if args['verbose']:
-        print("Analyzing code template...")
-    header_templ = Template(templ_str)
+        print("Using cached outputs of ", job.input)
+    if claims is not None:
+        claims.claim(job, [ os.path.join(job.odir, output) for output, _ in entry['outputs'] ])
+    os.makedirs(job.odir, exist_ok=True)
+    outputs = []
+    written = 0
+    for output, text in entry['outputs']:
+        path = job.odir + '/' + output
+        if os.path.dirname(output) != '':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        if write_file(path, text, args['write_if_changed']):
+            written += 1
+            if args['verbose']:
+                print("Writing ", output)
+        elif args['verbose']:
+            print("Unchanged ", output)
+        outputs.append(path)
+    profiling.count('cached outputs', len(outputs))
+    write_depfile(job, outputs, args)
+    return JobResult(job, True, outputs, written, len(outputs) - written, entry['skipped'])
 
-    with open(args['input'], 'r') as f:
-        text = f.read()
-        if args['verbose']:
-            print("Parsing input file...")
-        doc = parse_rst(args['input'], text)
-        visitor = RestProcessor(doc, text, args['verbose'])
+def parse_model(job: Job, text: str, args, caches: Caches) -> dict:
+    """Return the header model of the input document, from the model cache if it is there."""
+    if caches.model is not None:
+        with profiling.stage('model cache'):
+            headers = caches.model.get(text, job.globals)
+        if headers is not None:
+            if args['verbose']:
+                print("Using cached model of ", job.input)
+            profiling.count('cached models')
+            return headers
+    if args['verbose']:
+        print("Parsing input file...")
+    try:
+        from .restprocessor import RestProcessor
+    except:
+        from restprocessor import RestProcessor
+    rst_text = text
+    if not args['no_prescan']:
+        with profiling.stage('prescan'):
+            rst_text = prescan.prune(text, RestProcessor._SECTION_STATE_MAP)
+    with profiling.stage('parse_rst'):
+        doc = parse_rst(job.input, rst_text)
+    visitor = RestProcessor(doc, text, args['verbose'], caches.uml, job.globals)
+    with profiling.stage('walk'):
         doc.walkabout(visitor)
+    if profiling.active() is not None:
+        import docutils.nodes
+        profiling.count('tables', len(doc.traverse(docutils.nodes.table)))
+        profiling.count('paragraphs', len(doc.traverse(docutils.nodes.paragraph)))
+        profiling.count('uml blocks', len(doc.traverse(_rstparser().uml)))
+    if caches.model is not None:
+        with profiling.stage('model cache'):
+            caches.model.put(text, job.globals, visitor._headers)
+    return visitor._headers
 
-        if not os.path.exists(args['odir']):
-            if args['verbose']:
-                print("Creating output directory...")
-            os.mkdir(args['odir'])
-        elif not os.path.isdir(args['odir']):
-            print("ERROR: ", args['odir'], " is not a directory")
+def write_file(path: str, content: str, if_changed: bool = False) -> bool:
+    """Write the file through a temporary file and an atomic rename.
 
-        for header in visitor._headers:
-            try:
-                if args['dump']:
-                    print('------ Dump content for header: ', header, ' ------')
-                    dump = json.dumps(visitor._headers[header], indent=3)
-                    print(dump)
-                if visitor._headers[header]['generated']:
-                    buf = StringIO()
-                    ctx = Context(buf, file=header, content=visitor._headers[header])
-                    header_templ.render_context(ctx)
-                    if args['verbose']:
-                        print("Writing ", header)
-                    with open(args['odir'] + '/' + header, "w") as outf:
-                        outf.write(buf.getvalue())
+    With if_changed an existing file with the same content is left alone, so its modification time
+    does not trigger a rebuild of the C sources including it. Return whether the file was written.
+    """
+    if if_changed:
+        try:
+            with open(path, 'r') as f:
+                if f.read() == content:
+                    return False
+        except OSError:
+            pass
+    dir_name, file_name = os.path.split(path)
+    tmp_path = os.path.join(dir_name, '.' + file_name + '.' + str(os.getpid()) + '.' + str(threading.get_ident()) + '.tmp')
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+class HeaderResult(NamedTuple):
+    header: str
+    # The written or unchanged file, None when rendering failed.
+    output: Optional[str]
+    written: bool
+    log: str
+    render_time: float
+    write_time: float
+
+def render_content(templ, header: str, output: str, content: dict) -> str:
+    """Return the text the template renders for the header model content."""
+    from mako.runtime import Context
+    buf = StringIO()
+    templ.render_context(Context(buf, file=header, output=output, content=content))
+    return buf.getvalue()
+
+def render_header(templ, header: str, output: str, content: dict, odir: str, args) -> HeaderResult:
+    """Render one header to the output file. The messages go to the log of the result, so that the
+    headers rendered concurrently can be reported in header order."""
+    from mako import exceptions
+    log = StringIO()
+    render_time = 0.0
+    write_time = 0.0
+    try:
+        start = time.perf_counter()
+        text = render_content(templ, header, output, content)
+        render_time = time.perf_counter() - start
+        written = write_file(odir + '/' + output, text, args['write_if_changed'])
+        write_time = time.perf_counter() - start - render_time
+        if args['verbose']:
+            print("Writing " if written else "Unchanged ", output, file=log)
+    except:
+        print('Exception while rendering ' + output + ': ' + exceptions.text_error_template().render(), file=log)
+        return HeaderResult(header, None, False, log.getvalue(), render_time, write_time)
+    return HeaderResult(header, odir + '/' + output, written, log.getvalue(), render_time, write_time)
+
+# State of a render worker process, set up once by _init_render_worker().
+_render_templs = None
+_render_args = None
+
+def _init_render_worker(templates: List[TemplateSpec], module_cache, args):
+    global _render_templs, _render_args
+    _render_templs = [load_template(t.path, False, module_cache) for t in templates]
+    _render_args = args
+
+def _render_worker_header(task) -> HeaderResult:
+    return render_header(_render_templs[task[0]], *task[1:], _render_args)
+
+def render_headers(templs, tasks, job: Job, args, caches: Caches) -> Iterator[HeaderResult]:
+    """Render the (template index, header, output, content, odir) tasks and yield the results in task order.
+
+    With --render-jobs the headers are rendered by a pool of processes or threads. The models are only
+    read, every task writes its own file.
+    """
+    num_workers = min(args['render_jobs'], len(tasks))
+    if num_workers <= 1:
+        for task in tasks:
+            yield render_header(templs[task[0]], *task[1:], args)
+        return
+    import multiprocessing
+    from multiprocessing.pool import ThreadPool
+    # The batch workers are daemon processes, which cannot start a process pool of their own.
+    if args['render_pool'] == 'thread' or multiprocessing.current_process().daemon:
+        with ThreadPool(num_workers) as pool:
+            yield from pool.imap(lambda task: render_header(templs[task[0]], *task[1:], args), tasks)
+    else:
+        with multiprocessing.Pool(num_workers, _init_render_worker, (job.templ, caches.templates, args)) as pool:
+            yield from pool.imap(_render_worker_header, tasks)
+
+def generate(job: Job, args, caches: Caches = Caches(), claims: Optional[OutputClaims] = None) -> JobResult:
+    """Generate the headers of one job and return the generated files and counts.
+
+    With --from-model the input is a model file written by --export-model, and neither docutils nor Lark
+    are loaded. Without a template the model is only exported. All templates render from the same model.
+    With --output-cache a hit writes the cached files and loads none of docutils, Lark and Mako.
+    With claims the output files are claimed before they are written, which fails the job if another job
+    of the run writes one of them.
+    """
+    output_key = None
+    if caches.output is not None and len(job.templ) > 0 and not args['dump'] and args['export_model'] is None:
+        with profiling.stage('output cache'):
+            output_key = output_cache_key(job, args)
+            entry = caches.output.get(output_key)
+            if entry is not None:
+                return write_cached_outputs(job, entry, args, claims)
+
+    with profiling.stage('template'):
+        templs = [load_template(t.path, args['verbose'], caches.templates) for t in job.templ]
+
+    if args['from_model']:
+        with profiling.stage('read'):
+            headers = modelfile.load_model(job.input)
+        if job.globals is not None:
+            for header in headers:
+                headers[header].update(job.globals)
+    else:
+        with open(job.input, 'r') as f:
+            with profiling.stage('read'):
+                text = f.read()
+        profiling.count('documents')
+        headers = parse_model(job, text, args, caches)
+
+    exported = []
+    if args['export_model'] is not None:
+        path = modelfile.model_path(args['export_model'], job.input)
+        if args['verbose']:
+            print("Exporting model to ", path)
+        modelfile.save_model(path, headers, job.input)
+        exported.append(path)
+    if len(job.templ) == 0:
+        write_depfile(job, exported, args)
+        return JobResult(job, True)
+
+    if not os.path.exists(job.odir):
+        if args['verbose']:
+            print("Creating output directory...")
+        os.makedirs(job.odir, exist_ok=True)
+    elif not os.path.isdir(job.odir):
+        print("ERROR: ", job.odir, " is not a directory")
+
+    tasks = []
+    writers = {}
+    for header in headers:
+        if headers[header]['generated']:
+            for n, t in enumerate(job.templ):
+                if t.renders(header):
+                    output = t.output_name(header)
+                    if output in writers:
+                        raise RuntimeError("Error: " + output + " is written for both " + writers[output] + " and " +
+                                           header + ' (' + t.path + '), give the templates different output= patterns')
+                    writers[output] = header + ' (' + t.path + ')'
+                    tasks.append((n, header, output, headers[header], job.odir))
+    if claims is not None:
+        claims.claim(job, [ os.path.join(job.odir, output) for output in writers ])
+    # Output patterns may name subdirectories of the output directory.
+    for output_dir in set(os.path.dirname(output) for output in writers):
+        if output_dir != '':
+            os.makedirs(os.path.join(job.odir, output_dir), exist_ok=True)
+    results = render_headers(templs, tasks, job, args, caches)
+    pending = tasks[::-1]
+    profiler = profiling.active()
+    outputs = []
+    written = 0
+    skipped = 0
+    failed = 0
+    for header in headers:
+        if args['dump']:
+            print('------ Dump content for header: ', header, ' ------')
+            dump = json.dumps(headers[header], indent=3, default=as_dict)
+            print(dump)
+        if headers[header]['generated']:
+            while len(pending) > 0 and pending[-1][1] == header:
+                _, _, output, _, _ = pending.pop()
+                result = next(results)
+                print(result.log, end='')
+                if profiler is not None:
+                    profiler.add('render', result.render_time, header=job.odir + '/' + output)
+                    profiler.add('write', result.write_time)
+                if result.output is not None:
+                    profiling.count('headers rendered')
+                    outputs.append(result.output)
+                    if result.written:
+                        written += 1
                 else:
-                    if args['verbose']:
-                        print("Skip writing ", header)
-            except:
-                print('Exception while rendering ' + header + ': ' + exceptions.text_error_template().render())
+                    failed += 1
+        else:
+            if args['verbose']:
+                print("Skip writing ", header)
+            skipped += 1
+    if output_key is not None and len(outputs) == len(tasks):
+        with profiling.stage('output cache'):
+            texts = []
+            for path in outputs:
+                with open(path, 'r') as f:
+                    texts.append((path[len(job.odir) + 1:], f.read()))
+            caches.output.put(output_key, texts, skipped)
+    write_depfile(job, exported + outputs, args)
+    # A header that failed to render fails the job.
+    return JobResult(job, failed == 0, outputs, written, len(outputs) - written, skipped)
 
+def write_depfile(job: Job, outputs: List[str], args) -> None:
+    """With --depfile write the Make dependencies of the outputs of the job."""
+    if args['depfile'] is None:
+        return
+    path = modelfile.model_path(args['depfile'], job.input)
+    target = args['depfile_target']
+    if target is None and len(outputs) == 0:
+        target = path
+    if args['verbose']:
+        print("Writing dependencies to ", path)
+    content = depfile.depfile_content(job.input, [t.path for t in job.templ], outputs, target,
+                                      args['from_model'], args['depfile_phony'])
+    dir_name = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dir_name, exist_ok=True)
+    write_file(path, content, args['write_if_changed'])
+
+def run_job(job: Job, args, caches: Caches = Caches(), claims: Optional[OutputClaims] = None) -> JobResult:
+    """Run one job, reporting a failure instead of raising it so that the other jobs can go on."""
+    if args['verbose']:
+        print("Processing ", job.input)
+    try:
+        return generate(job, args, caches, claims)
+    except Exception as e:
+        print("ERROR: " + job.input + ": " + str(e))
+        if args['verbose']:
+            traceback.print_exc(file=sys.stdout)
+        return JobResult(job, False)
+
+# State of a batch worker process, set up once by _init_worker().
+_worker_args = None
+_worker_caches = None
+_worker_claims = None
+
+def _init_worker(args, claims):
+    global _worker_args, _worker_caches, _worker_claims
+    _worker_args = args
+    _worker_caches = make_caches(args)
+    _worker_claims = claims
+
+def _run_worker_job(job: Job) -> JobResult:
+    # The output is collected and printed by the parent in job order.
+    if _worker_args.get('profile'):
+        profiler = profiling.enable()
+    out = StringIO()
+    with redirect_stdout(out):
+        result = run_job(job, _worker_args, _worker_caches, _worker_claims)
+    result = result._replace(log=out.getvalue())
+    if _worker_args.get('profile'):
+        result = result._replace(profile=profiler.to_dict())
+    return result
+
+def run_jobs(jobs: List[Job], args, num_workers: int = 1) -> Iterator[JobResult]:
+    """Run the jobs and yield their results in job order.
+
+    With more than one worker the jobs are spread over a process pool and their output is printed
+    when the result is yielded, otherwise they run one by one in this process. Jobs sharing an output
+    directory claim their output files, so that a header of the same name generated from two inputs
+    fails the second job instead of overwriting the first one's file.
+    """
+    odirs = [ os.path.abspath(job.odir) for job in jobs if job.odir is not None and len(job.templ) > 0 ]
+    shared_odirs = len(set(odirs)) < len(odirs)
+    if num_workers <= 1 or len(jobs) <= 1:
+        caches = make_caches(args)
+        claims = OutputClaims() if shared_odirs else None
+        for job in jobs:
+            yield run_job(job, args, caches, claims)
+    else:
+        import multiprocessing
+        manager = multiprocessing.Manager() if shared_odirs else None
+        try:
+            claims = OutputClaims(manager.dict(), manager.Lock()) if manager is not None else None
+            with multiprocessing.Pool(min(num_workers, len(jobs)), _init_worker, (args, claims)) as pool:
+                for result in pool.imap(_run_worker_job, jobs):
+                    print(result.log, end='')
+                    if result.profile is not None and profiling.active() is not None:
+                        profiling.active().merge(result.profile)
+                    yield result
+        finally:
+            if manager is not None:
+                manager.shutdown()
+
+def watch(jobs: List[Job], args, interval: float) -> None:
+    """Run the jobs, then poll their input files and templates and run again the jobs affected by a change.
+
+    The directives, the uml parser, the compiled templates and the parsed models stay loaded between the runs.
+    The outputs are written as with --write-if-changed, so that the headers a change leaves alone keep their
+    modification time and do not trigger rebuilds.
+    """
+    args = dict(args, write_if_changed=True)
+    caches = make_caches(args)
+    if caches.model is None:
+        # One model per input, older versions of the documents are dropped.
+        caches = caches._replace(model=MemoryModelCache(max(len(jobs), 1)))
+    watcher = FileWatcher()
+    watcher.poll(set(os.path.abspath(f) for job in jobs for f in [job.input] + [t.path for t in job.templ]))
+    affected = jobs
+    try:
+        while True:
+            if len(affected) > 0:
+                claims = OutputClaims()
+                results = [run_job(job, args, caches, claims) for job in affected]
+                print("Headers: %d written, %d unchanged, %d skipped" % (sum(r.written for r in results),
+                                                                        sum(r.unchanged for r in results),
+                                                                        sum(r.skipped for r in results)))
+                print("Watching for changes, press Ctrl-C to stop...")
+            job_files = [[os.path.abspath(job.input)] + [f for t in job.templ for f in template_files(t.path)]
+                         for job in jobs]
+            changed = watcher.poll(set(f for files in job_files for f in files))
+            for path in changed:
+                forget_template(path)
+            affected = [job for job, files in zip(jobs, job_files) if len(changed.intersection(files)) > 0]
+            if len(affected) == 0:
+                time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
+
+def expand_inputs(patterns: List[str]) -> List[str]:
+    inputs = []
+    for pattern in patterns:
+        if glob.has_magic(pattern):
+            matches = sorted(glob.glob(pattern, recursive=True))
+            if len(matches) == 0:
+                print("WARNING: no input file matches " + pattern)
+            inputs += matches
+        else:
+            inputs.append(pattern)
+    return inputs
+
+def make_jobs(args) -> List[Job]:
+    """Pair the inputs with the output directories.
+
+    A single output directory is used for all inputs, otherwise every -i argument (which may be a glob
+    pattern) is paired with the -o argument at the same position.
+    """
+    if len(args['odir']) == 1:
+        odirs = args['odir'] * len(args['input'])
+    elif len(args['odir']) == len(args['input']):
+        odirs = args['odir']
+    else:
+        raise SystemExit("ERROR: give one output directory, or one for each input")
+    templates = [parse_template_spec(t) for t in args['templ']]
+    jobs = []
+    for pattern, odir in zip(args['input'], odirs):
+        for input in expand_inputs([pattern]):
+            jobs.append(Job(input, templates, odir))
+    return jobs
+
+def make_arg_parser() -> ArgumentParser:
+    parser = ArgumentParser()
+    parser.add_argument("-i", "--input", dest="input", help="rst input file or glob pattern, may be repeated",
+                        metavar="INPUT-FILE", required=False, action='append')
+    parser.add_argument("-t", "--template", dest="templ",
+                        help="header template, may be repeated; output=PATTERN names the output files "
+                             "({header}, {name}, {ext}) and filter=GLOB selects the headers it renders",
+                        metavar="TEMPLATE[,output=PATTERN][,filter=GLOB]", required=False, action='append')
+    parser.add_argument("-o", "--odir", dest="odir", help="output directory, either one for all inputs or one per input",
+                        metavar="OUTPUT-DIR", required=False, action='append')
+    parser.add_argument("-m", "--manifest", dest="manifest", help="JSON or TOML file listing the jobs to run",
+                        metavar="MANIFEST", required=False)
+    parser.add_argument("--shard", dest="shard", help="run only the I-th of N balanced parts of the manifest jobs",
+                        metavar="I/N", required=False)
+    parser.add_argument("--report", dest="report", help="write the jobs run and their outputs to a JSON report",
+                        metavar="REPORT-FILE", required=False)
+    parser.add_argument("--merge", dest="merge", help="check that the shard reports cover every manifest job exactly once",
+                        metavar="REPORT-FILE", nargs='+', required=False)
+    parser.add_argument("--export-model", dest="export_model",
+                        help="write the parsed model to FILE (gzip compressed for *.gz), {name} and {dir} stand for the "
+                             "input file name and the name of its directory",
+                        metavar="FILE", required=False)
+    parser.add_argument("--depfile", dest="depfile",
+                        help="write the Make/Ninja dependencies of the generated files to FILE, {name} and {dir} stand "
+                             "for the input file name and the name of its directory",
+                        metavar="FILE", required=False)
+    parser.add_argument("--depfile-target", dest="depfile_target",
+                        help="target of the --depfile rule instead of the generated files, e.g. a stamp file",
+                        metavar="TARGET", required=False)
+    parser.add_argument("--depfile-phony", dest="depfile_phony",
+                        help="add an empty rule for every dependency, so that deleting one does not break Make",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--from-model", dest="from_model", help="the inputs are model files written by --export-model",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("-d", "--dump", dest="dump", help="dump content dictionary", default=False, required=False, action='store_true')
+    parser.add_argument("-v", "--verbose", dest="verbose", help="Be more articulate about what is going on",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("-w", "--write-if-changed", dest="write_if_changed",
+                        help="leave output files alone when their content does not change",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("-j", "--jobs", dest="jobs", help="number of worker processes for many inputs (default: %(default)s)",
+                        metavar="N", type=int, default=1, required=False)
+    parser.add_argument("--watch", dest="watch", help="keep running and regenerate when an input file or template changes",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--watch-interval", dest="watch_interval", help="seconds between checks for changes (default: %(default)s)",
+                        metavar="SECONDS", type=float, default=1.0, required=False)
+    parser.add_argument("--no-prescan", dest="no_prescan",
+                        help="let docutils parse the whole input, not only the sections the headers are generated from",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--cache-dir", dest="cache_dir", help="directory for the caches (default: %(default)s)",
+                        metavar="CACHE-DIR", default=DEFAULT_CACHE_DIR, required=False)
+    parser.add_argument("--no-uml-cache", dest="no_uml_cache", help="do not cache the uml dependency diagram scans",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--uml-cache-size", dest="uml_cache_size", help="uml cache size limit in MB (default: %(default)s)",
+                        metavar="MB", type=int, default=16, required=False)
+    parser.add_argument("--no-template-cache", dest="no_template_cache", help="do not keep the compiled template modules",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--template-cache-size", dest="template_cache_size",
+                        help="compiled template cache size limit in MB (default: %(default)s)",
+                        metavar="MB", type=int, default=16, required=False)
+    parser.add_argument("--no-model-cache", dest="no_model_cache", help="do not cache the parsed models of the input files",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--model-cache-size", dest="model_cache_size", help="model cache size limit in MB (default: %(default)s)",
+                        metavar="MB", type=int, default=64, required=False)
+    parser.add_argument("--output-cache", dest="output_cache",
+                        help="cache the generated files of every input in CACHE-DIR, which parallel builds may share",
+                        metavar="CACHE-DIR", required=False)
+    parser.add_argument("--output-cache-size", dest="output_cache_size",
+                        help="output cache size limit in MB (default: %(default)s)",
+                        metavar="MB", type=int, default=256, required=False)
+    parser.add_argument("--output-cache-stats", dest="output_cache_stats",
+                        help="print the hits, misses and size of the --output-cache, without inputs only print them",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--render-jobs", dest="render_jobs",
+                        help="number of headers of one input rendered concurrently (default: %(default)s)",
+                        metavar="N", type=int, default=1, required=False)
+    parser.add_argument("--render-pool", dest="render_pool", help="render the headers in processes or threads (default: %(default)s)",
+                        choices=['process', 'thread'], default='process', required=False)
+    parser.add_argument("--profile", dest="profile", help="print the time spent per stage and per header, and element counts",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--profile-json", dest="profile_json", help="write the --profile report to a JSON file",
+                        metavar="FILE", required=False)
+    parser.add_argument("--profile-cprofile", dest="profile_cprofile",
+                        help="write cProfile statistics of this process to FILE, to be read with pstats",
+                        metavar="FILE", required=False)
+    parser.add_argument("--profile-tracemalloc", dest="profile_tracemalloc",
+                        help="trace memory allocations and write the final tracemalloc snapshot to FILE",
+                        metavar="FILE", required=False)
+    return parser
+
+def shared_path(jobs: List[Job], pattern: str) -> Optional[Tuple[Job, Job, str]]:
+    """Return two jobs for which the file name pattern of --export-model or --depfile names the same
+    file, and the file, or None."""
+    jobs_by_path = {}
+    for job in jobs:
+        path = os.path.abspath(modelfile.model_path(pattern, job.input))
+        if path in jobs_by_path:
+            return jobs_by_path[path], job, path
+        jobs_by_path[path] = job
+    return None
+
+def get_jobs(args, parser: ArgumentParser) -> List[Job]:
+    """Return the jobs given by the options: the manifest jobs of the selected shard, or the -i/-t/-o jobs."""
+    if args['manifest'] is not None:
+        jobs = manifest.load_manifest(args['manifest'])
+        if args['merge'] is not None:
+            sys.exit(0 if manifest.merge_reports(jobs, args['merge']) else 1)
+        if args['shard'] is not None:
+            shard_index, num_shards = manifest.parse_shard(args['shard'])
+            jobs = manifest.select_shard(jobs, shard_index, num_shards)
+    elif args['input'] is None:
+        parser.error("the following arguments are required: -i/--input, -t/--template, -o/--odir (or -m/--manifest)")
+    elif args['templ'] is None and args['odir'] is None and args['export_model'] is not None:
+        # Only export the models.
+        jobs = [Job(input, [], None) for input in expand_inputs(args['input'])]
+    elif args['templ'] is None or args['odir'] is None:
+        parser.error("the following arguments are required: -i/--input, -t/--template, -o/--odir (or -m/--manifest)")
+    else:
+        try:
+            jobs = make_jobs(args)
+        except RuntimeError as e:
+            parser.error(str(e))
+    for job in jobs:
+        conflict = conflicting_templates(job.templ)
+        if conflict is not None:
+            parser.error("the templates " + conflict[0].path + " and " + conflict[1].path + " both write " +
+                         conflict[0].output + ", give them different output= patterns or filters")
+    if args['export_model'] is not None and len(jobs) > 1 and '{' not in args['export_model']:
+        parser.error("--export-model needs a {name} or {dir} placeholder for more than one input")
+    if args['export_model'] is not None:
+        shared = shared_path(jobs, args['export_model'])
+        if shared is not None:
+            parser.error("--export-model writes " + shared[2] + " for both " + shared[0].input + " and " +
+                         shared[1].input + ", use a pattern telling them apart, e.g. with {dir}")
+    if args['depfile'] is not None and len(jobs) > 1 and '{' not in args['depfile']:
+        parser.error("--depfile needs a {name} or {dir} placeholder for more than one input")
+    if args['depfile'] is not None:
+        shared = shared_path(jobs, args['depfile'])
+        if shared is not None:
+            parser.error("--depfile writes " + shared[2] + " for both " + shared[0].input + " and " +
+                         shared[1].input + ", use a pattern telling them apart, e.g. with {dir}")
+    return jobs
+
+def print_summary(results: List[JobResult], args) -> List[str]:
+    """Print the header counts and the failed jobs, and return the failed inputs."""
+    failed = [r.job.input for r in results if not r.ok]
+    print("Headers: %d written, %d unchanged, %d skipped" % (sum(r.written for r in results),
+                                                            sum(r.unchanged for r in results),
+                                                            sum(r.skipped for r in results)))
+    if len(results) > 1:
+        print("Processed %d input files, %d failed" % (len(results), len(failed)))
+        for input in failed:
+            print("  failed: " + input)
     if args['verbose']:
         print("Done.")
+    return failed
+
+def main():
+    print("restuml2code version ", __version__)
+    parser = make_arg_parser()
+    args = vars(parser.parse_args())
+    if args['output_cache_stats']:
+        if args['output_cache'] is None:
+            parser.error("--output-cache-stats needs --output-cache")
+        if args['input'] is None and args['manifest'] is None:
+            make_caches(args).output.print_stats()
+            return
+    jobs = get_jobs(args, parser)
+
+    if args['watch']:
+        watch(jobs, args, args['watch_interval'])
+        return
+
+    args['profile'] = args['profile'] or args['profile_json'] is not None
+    if args['profile']:
+        profiler = profiling.enable()
+        profiler.add('import', _import_time)
+    if args['profile_tracemalloc'] is not None:
+        import tracemalloc
+        tracemalloc.start()
+    if args['profile_cprofile'] is not None:
+        import cProfile
+        cprofiler = cProfile.Profile()
+        cprofiler.enable()
+
+    results = list(run_jobs(jobs, args, args['jobs']))
+
+    if args['profile_cprofile'] is not None:
+        cprofiler.disable()
+        cprofiler.dump_stats(args['profile_cprofile'])
+    if args['profile_tracemalloc'] is not None:
+        tracemalloc.take_snapshot().dump(args['profile_tracemalloc'])
+        if args['profile']:
+            profiler.count('peak memory bytes', tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+
+    if args['report'] is not None:
+        manifest.write_report(args['report'], results, args['shard'])
+
+    if args['profile']:
+        profiler.print_report()
+        if args['profile_json'] is not None:
+            profiler.write_json(args['profile_json'])
+
+    failed = print_summary(results, args)
+    if args['output_cache_stats']:
+        make_caches(args).output.print_stats()
+    if len(failed) > 0:
+        sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,148 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Job manifests for spreading the generation over several build nodes.
+#
+# A manifest lists the jobs to run, in JSON:
+#
+#   { "jobs": [ { "input": "Det/design.rst", "template": "header.h", "odir": "gen/Det",
+#                 "globals": { "module": "Det" } } ] }
+#
+# or in TOML, with one [[jobs]] table per job. Relative paths are relative to the manifest file.
+# "template" may also be a list, every template is given as for -t, e.g. "stub.c,output={name}_stub.c".
+# Every node runs one shard (--shard I/N) and writes a report (--report), and the merge step
+# (--merge REPORT...) checks that the reports cover every job exactly once.
+
+import json
+import os
+from typing import List, Tuple
+
+try:
+    from .job import Job, JobResult, parse_template_spec
+except:
+    from job import Job, JobResult, parse_template_spec
+
+def _load_toml(path):
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise RuntimeError("Error: reading TOML manifests needs Python 3.11 or the tomli package")
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
+
+def load_manifest(path: str) -> List[Job]:
+    if path.endswith('.toml'):
+        data = _load_toml(path)
+    else:
+        with open(path, 'r') as f:
+            data = json.load(f)
+    base_dir = os.path.dirname(path)
+    jobs = []
+    for n, entry in enumerate(data.get('jobs', [])):
+        for key in ['input', 'template', 'odir']:
+            if key not in entry:
+                raise RuntimeError("Error: manifest job " + str(n) + " has no '" + key + "'")
+        templates = entry['template'] if isinstance(entry['template'], list) else [entry['template']]
+        jobs.append(Job(os.path.join(base_dir, entry['input']),
+                        [parse_template_spec(t, base_dir) for t in templates],
+                        os.path.join(base_dir, entry['odir']),
+                        entry.get('globals')))
+    return jobs
+
+def parse_shard(shard: str) -> Tuple[int, int]:
+    """Parse the 'I/N' shard specification, with I counted from 1."""
+    try:
+        index, count = (int(n) for n in shard.split('/'))
+    except ValueError:
+        raise SystemExit("ERROR: invalid shard '" + shard + "', expected I/N")
+    if count < 1 or index < 1 or index > count:
+        raise SystemExit("ERROR: invalid shard '" + shard + "', expected 1 <= I <= N")
+    return index, count
+
+def _job_weight(job: Job) -> int:
+    try:
+        return os.path.getsize(job.input)
+    except OSError:
+        return 0
+
+def assign_shards(jobs: List[Job], num_shards: int) -> List[int]:
+    """Return the shard number (from 0) of every job.
+
+    The jobs are weighted by input size and given, largest first, to the least loaded shard. The
+    result depends only on the manifest and the input sizes, so all nodes agree on it.
+    """
+    order = sorted(range(len(jobs)), key=lambda n: (-_job_weight(jobs[n]), n))
+    loads = [0] * num_shards
+    shards = [0] * len(jobs)
+    for n in order:
+        shard = loads.index(min(loads))
+        shards[n] = shard
+        loads[shard] += _job_weight(jobs[n])
+    return shards
+
+def select_shard(jobs: List[Job], shard_index: int, num_shards: int) -> List[Job]:
+    shards = assign_shards(jobs, num_shards)
+    return [job for n, job in enumerate(jobs) if shards[n] == shard_index - 1]
+
+def _template_id(t) -> str:
+    return t.path + ',output=' + t.output + (',filter=' + t.filter if t.filter is not None else '')
+
+def _job_id(job: Job) -> str:
+    return job.input + ' -> ' + str(job.odir) + ' (' + ', '.join(_template_id(t) for t in job.templ) + ')'
+
+def write_report(path: str, results: List[JobResult], shard: str) -> None:
+    report = {
+        'shard': shard,
+        'jobs': [ { 'job': _job_id(r.job), 'ok': r.ok, 'outputs': r.outputs } for r in results ]
+    }
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=1)
+
+def merge_reports(jobs: List[Job], report_paths: List[str]) -> bool:
+    """Check that every manifest job was run exactly once and succeeded, and that no output was written twice."""
+    runs = {}
+    writers = {}
+    ok = True
+    for path in report_paths:
+        with open(path, 'r') as f:
+            report = json.load(f)
+        for entry in report['jobs']:
+            runs.setdefault(entry['job'], []).append(path)
+            if not entry['ok']:
+                print("ERROR: job " + entry['job'] + " failed in " + path)
+                ok = False
+            for output in entry['outputs']:
+                writers.setdefault(output, []).append(entry['job'])
+    for job in jobs:
+        job_runs = runs.pop(_job_id(job), [])
+        if len(job_runs) != 1:
+            print("ERROR: job " + _job_id(job) + " was run " + str(len(job_runs)) + " times")
+            ok = False
+    for job_id in runs:
+        print("ERROR: job " + job_id + " is not in the manifest")
+        ok = False
+    for output in writers:
+        if len(writers[output]) > 1:
+            print("ERROR: " + output + " was written by " + str(len(writers[output])) + " jobs")
+            ok = False
+    print("Merged %d reports: %d jobs, %d outputs, %s" % (len(report_paths), len(jobs), len(writers),
+                                                          "OK" if ok else "FAILED"))
+    return ok
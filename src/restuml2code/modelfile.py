@@ -0,0 +1,81 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Model files hold the header model of a design document (RestProcessor._headers, see model.txt),
+# so that it can be rendered later without parsing the document again:
+#
+#   { "format": "restuml2code-model", "format-version": 1, "version": "0.17", "source": "design.rst",
+#     "headers": { "Det.h": { ... }, ... } }
+#
+# The JSON is written without whitespace. Files named *.gz are gzip compressed.
+
+import json
+import os
+from typing import Optional
+
+try:
+    from . import __version__
+    from .contentmodel import as_dict, headers_from_dict
+except:
+    from __init__ import __version__
+    from contentmodel import as_dict, headers_from_dict
+
+MODEL_FORMAT = 'restuml2code-model'
+MODEL_FORMAT_VERSION = 1
+
+def _open(path: str, mode: str, compressed: bool):
+    if compressed:
+        import gzip
+        return gzip.open(path, mode)
+    return open(path, mode)
+
+def model_path(pattern: str, input: str) -> str:
+    """Return the model file for the input. In the pattern {name} stands for the input file name without
+    extension and {dir} for the name of its directory."""
+    input = os.path.abspath(input)
+    return pattern.replace('{name}', os.path.splitext(os.path.basename(input))[0]).replace(
+        '{dir}', os.path.basename(os.path.dirname(input)))
+
+def save_model(path: str, headers: dict, source: Optional[str] = None) -> None:
+    data = { 'format': MODEL_FORMAT, 'format-version': MODEL_FORMAT_VERSION, 'version': __version__,
+             'source': source, 'headers': headers }
+    dir_name, file_name = os.path.split(os.path.abspath(path))
+    os.makedirs(dir_name, exist_ok=True)
+    tmp_path = os.path.join(dir_name, '.' + file_name + '.' + str(os.getpid()) + '.tmp')
+    try:
+        with _open(tmp_path, 'wb', path.endswith('.gz')) as f:
+            f.write(json.dumps(data, separators=(',', ':'), default=as_dict).encode('utf-8'))
+        os.replace(tmp_path, path)
+    except:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def load_model(path: str) -> dict:
+    """Return the headers of a model file written by save_model()."""
+    with _open(path, 'rb', path.endswith('.gz')) as f:
+        try:
+            data = json.loads(f.read())
+        except ValueError as e:
+            raise RuntimeError("Error: " + path + " is not a restuml2code model file: " + str(e))
+    if not isinstance(data, dict) or data.get('format') != MODEL_FORMAT:
+        raise RuntimeError("Error: " + path + " is not a restuml2code model file")
+    if data.get('format-version') != MODEL_FORMAT_VERSION:
+        raise RuntimeError("Error: " + path + " has model format version " + str(data.get('format-version')) +
+                           ", expected " + str(MODEL_FORMAT_VERSION))
+    return headers_from_dict(data['headers'])
@@ -0,0 +1,149 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Line based pre-scan of the design documents before docutils parses them.
+#
+# RestProcessor only reads the sections with a title naming one of its section kinds (and everything
+# nested in them) and the field lists of the global fields. The other lines, mostly prose, requirement
+# items and diagrams, are replaced by empty lines, which docutils skips quickly. The line numbers of the
+# remaining lines do not change, so node.line and the error messages still refer to the document.
+#
+# Field lists nested in other blocks (a block quote, a note, a list item) are global fields as well. The
+# whole top-level block holding such a field list is kept, so that docutils reads it in the same context.
+# The field lists directly after a directive line are its options and do not keep the directive.
+#
+# All section titles are kept, so docutils builds the same section tree. The titles are found with the
+# rules of docutils: a text line at the start of a block with an underline at least as long (or of 4 or
+# more characters), or the text between an overline and an identical underline. The title levels follow
+# the order in which the adornment styles first appear.
+
+import re
+from typing import Iterable, List, Optional, Tuple
+
+_ADORNMENT = re.compile(r'([!-/:-@\[-`{-~])\1* *$')
+_FIELD_MARKER = re.compile(r':(?![: ])([^:\\]|\\.|:(?!([ `]|$)))*(?<! ):( +|$)')
+# Lines docutils reads as the start of a list or of explicit markup rather than as text.
+_NOT_TEXT = re.compile(r'([-+*\u2022\u2023\u2043]|\.\.|\|)( +|$)')
+# Directives changing how the rest of the document is parsed, kept wherever they are.
+_PARSER_DIRECTIVE = re.compile(r'\.\. +(role|default-role) ?::( +|$)')
+# Documents including other files are not pruned, the scan cannot see the sections of the included text.
+_INCLUDE = re.compile(r'^[ \t]*\.\. +include ?::', re.MULTILINE)
+
+def _is_blank(line: str) -> bool:
+    return line.strip() == ''
+
+def _is_indented(line: str) -> bool:
+    return line[:1] in (' ', '\t')
+
+def _title_at(lines: List[str], i: int) -> Optional[Tuple[int, str, str]]:
+    """Return (number of lines, title text, adornment style) of a section title at the start of a
+    block at line i, or None."""
+    line = lines[i].rstrip()
+    if _is_indented(line) or len(line) == 0 or i + 1 >= len(lines):
+        return None
+    if _ADORNMENT.match(line):
+        if i + 2 < len(lines) and not _is_blank(lines[i + 1]) and lines[i + 2].rstrip() == line:
+            return 3, lines[i + 1].strip(), line[0] * 2
+        return None
+    if _NOT_TEXT.match(line) or _FIELD_MARKER.match(line):
+        return None
+    underline = lines[i + 1].rstrip()
+    if _ADORNMENT.match(underline) and (len(underline) >= len(line) or len(underline) >= 4):
+        return 2, line, underline[0]
+    return None
+
+def _block_end(lines: List[str], i: int, field_list: bool) -> int:
+    """Return the line after the block starting at line i: its indented lines and, for a field list,
+    its further fields."""
+    i += 1
+    while i < len(lines):
+        line = lines[i]
+        if not (_is_blank(line) or _is_indented(line) or (field_list and _FIELD_MARKER.match(line))):
+            break
+        i += 1
+    return i
+
+def _enclosing_block_start(lines: List[str], i: int, keep: List[bool]) -> Optional[int]:
+    """Return the first line of the top-level block holding the indented field list at line i, or None
+    if it is the options of a directive."""
+    j = i - 1
+    while j >= 0 and (_is_blank(lines[j]) or _is_indented(lines[j])):
+        j -= 1
+    if j < 0 or keep[j]:
+        # Directly in the section after its title.
+        return j + 1
+    if lines[j].startswith('..') and not any(_is_blank(line) for line in lines[j + 1:i]):
+        return None
+    while j > 0 and not (_is_blank(lines[j - 1]) or _is_indented(lines[j - 1]) or keep[j - 1]):
+        j -= 1
+    return j
+
+def prune(text: str, section_titles: Iterable[str]) -> str:
+    """Return the text with the lines RestProcessor does not read blanked out.
+
+    section_titles are the words marking the sections it reads (RestProcessor._SECTION_STATE_MAP).
+    """
+    if _INCLUDE.search(text):
+        return text
+    section_titles = list(section_titles)
+    lines = text.splitlines()
+    keep = [ False ] * len(lines)
+    styles = []
+    # Whether the lines of each open section are kept, by section level.
+    sections = []
+    block_start = True
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        title = _title_at(lines, i) if block_start else None
+        if title is not None:
+            length, title_text, style = title
+            level = styles.index(style) + 1 if style in styles else len(styles) + 1
+            # As in docutils, a new style starts a subsection of the lowest level only. Titles at a wrong
+            # level do not start a section.
+            if level <= len(sections) + 1 and (style in styles or len(styles) == len(sections)):
+                if style not in styles:
+                    styles.append(style)
+                del sections[level - 1:]
+                title_text = title_text.replace('\\', '')
+                sections.append((len(sections) > 0 and sections[-1]) or
+                                any(t in title_text for t in section_titles))
+            keep[i:i + length] = [ True ] * length
+            i += length
+            block_start = True
+            continue
+        if len(sections) > 0 and sections[-1]:
+            keep[i] = True
+        elif block_start and not _is_indented(line) and (_FIELD_MARKER.match(line) or _PARSER_DIRECTIVE.match(line)):
+            end = _block_end(lines, i, _FIELD_MARKER.match(line) is not None)
+            keep[i:end] = [ True ] * (end - i)
+            i = end
+            block_start = True
+            continue
+        elif _is_indented(line) and _FIELD_MARKER.match(line.lstrip()):
+            start = _enclosing_block_start(lines, i, keep)
+            if start is not None:
+                end = _block_end(lines, i, False)
+                keep[start:end] = [ True ] * (end - start)
+                i = end
+                block_start = True
+                continue
+        # A block starts after an empty line or where the indentation ends.
+        block_start = _is_blank(line) or (_is_indented(line) and i + 1 < len(lines) and not _is_indented(lines[i + 1]))
+        i += 1
+    return ''.join((line if k else '') + '\n' for line, k in zip(lines, keep))
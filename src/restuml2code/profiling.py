@@ -0,0 +1,135 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+class Profiler:
+    """Collects the time spent per stage, per generated header and the counts of the processed elements.
+
+    Stages may be nested. The time of a stage does not include the time of the stages nested in it,
+    so the stage times add up to the total.
+    """
+
+    def __init__(self) -> None:
+        # name -> [time, calls]
+        self.stages = {}
+        # output file -> render time
+        self.headers = {}
+        self.counts = {}
+        self._nested = []
+
+    @contextmanager
+    def stage(self, name: str, header: Optional[str] = None):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if len(self._nested) > 0:
+                self._nested[-1] += elapsed
+            self.add(name, elapsed - nested)
+            if header is not None:
+                self.headers[header] = self.headers.get(header, 0.0) + elapsed
+
+    def add(self, name: str, seconds: float, calls: int = 1, header: Optional[str] = None) -> None:
+        """Add time measured elsewhere, e.g. by a render worker."""
+        entry = self.stages.setdefault(name, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += calls
+        if header is not None:
+            self.headers[header] = self.headers.get(header, 0.0) + seconds
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def to_dict(self) -> dict:
+        return {
+            'stages': { name: { 'time': t, 'calls': calls } for name, (t, calls) in self.stages.items() },
+            'headers': dict(self.headers),
+            'counts': dict(self.counts),
+            'total': sum(t for t, _ in self.stages.values()),
+        }
+
+    def merge(self, profile: dict) -> None:
+        """Add a profile returned by to_dict(), e.g. from a worker process."""
+        for name, s in profile['stages'].items():
+            self.add(name, s['time'], s['calls'])
+        for header, t in profile['headers'].items():
+            self.headers[header] = self.headers.get(header, 0.0) + t
+        for name, n in profile['counts'].items():
+            self.count(name, n)
+
+    def print_report(self) -> None:
+        profile = self.to_dict()
+        print("Profile by stage:")
+        for name, s in sorted(profile['stages'].items(), key=lambda s: -s[1]['time']):
+            print("  %-14s %10.2f ms %6d calls" % (name, s['time'] * 1000, s['calls']))
+        print("  %-14s %10.2f ms" % ('total', profile['total'] * 1000))
+        if len(profile['headers']) > 0:
+            print("Profile by header:")
+            for header, t in sorted(profile['headers'].items(), key=lambda h: -h[1]):
+                print("  %10.2f ms  %s" % (t * 1000, header))
+        if len(profile['counts']) > 0:
+            print("Counts:")
+            for name, n in profile['counts'].items():
+                print("  %-18s %d" % (name + ':', n))
+
+    def write_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+# The profiler of this process, None when not profiling.
+_profiler = None
+
+def enable() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+def disable() -> None:
+    global _profiler
+    _profiler = None
+
+def active() -> Optional[Profiler]:
+    return _profiler
+
+class _NoStage:
+    """contextlib.nullcontext, which Python 3.6 does not have."""
+
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc_info):
+        return False
+
+_NO_STAGE = _NoStage()
+
+def stage(name: str, header: Optional[str] = None):
+    """Context manager timing a stage, doing nothing when not profiling."""
+    if _profiler is None:
+        return _NO_STAGE
+    return _profiler.stage(name, header)
+
+def count(name: str, n: int = 1) -> None:
+    if _profiler is not None:
+        _profiler.count(name, n)
@@ -19,16 +19,18 @@
 import docutils
 import docutils.nodes
 from typing import NamedTuple, Any, List, Dict
-import copy
+import bisect
 
 try:
     from .uml import uml
     from .item import item
-    from .umldependencyscanner import UmlDependencyScanner
+    from .contentmodel import (Header, Function, MacroFunction, Type, MacroConstantsGroup, VariablesGroup,
+                               Parameter, ReturnValue, StructElement, Constant, Variable, Definition)
 except:
     from uml import uml
     from item import item
-    from umldependencyscanner import UmlDependencyScanner
+    from contentmodel import (Header, Function, MacroFunction, Type, MacroConstantsGroup, VariablesGroup,
+                              Parameter, ReturnValue, StructElement, Constant, Variable, Definition)
 
 class RestProcessor(docutils.nodes.SparseNodeVisitor):
 
@@ -73,15 +75,20 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
         KeyEntry('Call cycle interval:', 'call-cycle-interval', dict([(_FUNCTION_TABLE, -1), (_MACRO_FUNCTION_TABLE, -1)]))
     ]
 
-    def __init__(self, doc, text, verbose=False) -> None:
+    def __init__(self, doc, text, verbose=False, uml_cache=None, global_overrides=None) -> None:
         super().__init__(doc)
         self._headers = {}
-        self._lines = text.splitlines()
         self._state = self._PASS
         self._verbose = verbose
         self._rownum = -1
         self._globals = {}
+        self._row_label_matches = {}
         self._private_section = False
+        self._uml_cache = uml_cache
+        self._global_overrides = global_overrides if global_overrides is not None else {}
+        for field_name in self._global_overrides:
+            if field_name in self._RESERVED_FIELDS:
+                raise RuntimeError("Error: '" + field_name + "' cannot be used for a global field name")
 
     def _verbose_print(self, *args, **kwargs):
         if self._verbose:
@@ -114,6 +121,7 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
         HeaderAttribute('description', ''),
         HeaderAttribute('generated', False)
     ]
+    _RESERVED_FIELDS = frozenset(a.name for a in _HEADER_ATTRIBUTES)
 
     def visit_section(self, node: docutils.nodes.section) -> None:
         for c in node.children:
@@ -135,14 +143,58 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
                 self._state = self._PASS
 
     def _add_header(self, header):
-        self._headers.setdefault(header, {})
-        for hattr in self._HEADER_ATTRIBUTES:
-            self._headers[header].setdefault(hattr.name, copy.deepcopy(hattr.default))
-        self._headers[header]['file-name'] = header
+        self._headers[header] = Header(header)
+
+    # Model element built from the tables of a section.
+    _ELEMENT_TYPES = {
+        _FUNCTION_TABLE: Function,
+        _TYPE_TABLE: Type,
+        _MACRO_CONSTANTS_TABLE: MacroConstantsGroup,
+        _MACRO_FUNCTION_TABLE: MacroFunction,
+        _VARIABLE_TABLE: VariablesGroup,
+    }
 
     def visit_table(self, node: docutils.nodes.table) -> None:
         self._rownum = 0
-        self._elem_attributes = {}
+        self._elem_attributes = self._ELEMENT_TYPES.get(self._state, dict)()
+        self._entry_columns = self._index_columns(node)
+
+    # Nested rows (e.g. function parameters) have the 1st column omitted by the grid table parser,
+    # so the column number of a cell is the count of the cells to its left in the same source line,
+    # including the cells spanning down from the rows above. It is worked out once per table from the
+    # cell spans, and get_colnum() looks it up by the cell of the paragraph.
+    def _index_columns(self, node: docutils.nodes.table) -> Dict[int, int]:
+        entry_columns = {}
+        for tgroup in node.children:
+            if not isinstance(tgroup, docutils.nodes.tgroup):
+                continue
+            # Cells spanning down from the rows above: [first grid column, last grid column, rows left].
+            spans_down = []
+            for part in tgroup.children:
+                if not isinstance(part, (docutils.nodes.thead, docutils.nodes.tbody)):
+                    continue
+                for row in part.children:
+                    cells = sorted((first, last) for first, last, _ in spans_down)
+                    spanned = list(cells)
+                    row_entries = []
+                    gridcol = 0
+                    for entry in row.children:
+                        for first, last in spanned:
+                            if first <= gridcol <= last:
+                                gridcol = last + 1
+                        last = gridcol + entry.get('morecols', 0)
+                        row_entries.append((entry, gridcol))
+                        if entry.get('morerows', 0) > 0:
+                            spans_down.append([gridcol, last, entry['morerows'] + 1])
+                        cells.append((gridcol, last))
+                        gridcol = last + 1
+                    ends = sorted(last for _, last in cells)
+                    for entry, first in row_entries:
+                        entry_columns[id(entry)] = bisect.bisect_left(ends, first) + 1
+                    for span in spans_down:
+                        span[2] -= 1
+                    spans_down = [ span for span in spans_down if span[2] > 0 ]
+        return entry_columns
 
     def depart_table(self, node):
         self._rownum = -1
@@ -183,14 +235,12 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
     def visit_row(self, node):
         self._rownum += 1
 
-    # Nested rows (e.g. function parameters) have the 1st column omitted by the grid table parser,
-    # so we have to figure out the column number depending on the count of '|' before the paragraph text.
-    def get_colnum(self, node: docutils.nodes.paragraph, content) -> None:
-        content = content.splitlines()[0]
-        src_line = self._lines[node.line - 1]
-        cont_pos = src_line.find(content)
-        assert cont_pos > -1
-        return src_line[1:cont_pos].count('|')
+    def get_colnum(self, node: docutils.nodes.paragraph, content=None) -> int:
+        entry = node.parent
+        while not isinstance(entry, docutils.nodes.entry):
+            entry = entry.parent
+        return self._entry_columns[id(entry)]
+
 
     def _get_description(self, content):
         descr = content.replace('\n', ' ')
@@ -198,148 +248,172 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
              descr += '.'
         return descr
 
-    def _add_type_attribute(self, colnum, node, content):
-        if self._rownum < 5:
-            self._assert_syntax(colnum == 2, node.line)
-            self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
-            self._elem_attributes[self._attr_to_add] = self._get_description(content) if self._attr_to_add == 'description' else content
-        else:
-            assert 'kind' in self._elem_attributes
-            if self._attr_to_add == 'elements':
-                self._assert_syntax(self._elem_attributes['kind'] == 'Structure', node.line)
-                self._assert_syntax(colnum in [2, 3, 4], node.line)
-                self._elem_attributes.setdefault(self._attr_to_add, [])
-                if colnum == 2:
-                    self._elem_attributes[self._attr_to_add].append({ 'type': content })
-                elif colnum == 3:
-                    self._elem_attributes[self._attr_to_add][-1]['field'] = content
-                elif colnum == 4:
-                    self._elem_attributes[self._attr_to_add][-1]['description'] = self._get_description(content)
-            elif self._attr_to_add == 'type':
-                self._assert_syntax(colnum == 2)
-                self._elem_attributes[self._attr_to_add] = content
-            elif self._attr_to_add == 'constants':
-                self._assert_syntax(self._elem_attributes['kind'] == 'Enumeration', node.line)
-                self._assert_syntax(colnum in [2, 3, 4], node.line)
-                self._elem_attributes.setdefault(self._attr_to_add, [])
-                if colnum == 2:
-                    self._elem_attributes[self._attr_to_add].append({ 'name': content })
-                elif colnum == 3:
-                    self._elem_attributes[self._attr_to_add][-1]['value'] = content
-                else:
-                    self._elem_attributes[self._attr_to_add][-1]['description'] = self._get_description(content)
+    def _is_yes(self, content):
+        return 'Yes' in content or 'yes' in content
 
-    def _add_function_attribute(self, colnum, node, content):
-        if self._rownum <= 6:
-            self._assert_syntax(colnum == 2, node.line)
-            self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
-            if self._attr_to_add == 'description':
-                self._elem_attributes[self._attr_to_add] = self._get_description(content)
-            elif self._attr_to_add == 'allowed-from-isr':
-                self._elem_attributes[self._attr_to_add] = 'Yes' in content or 'yes' in content
-            elif self._attr_to_add == 'is-reentrant':
-                self._elem_attributes[self._attr_to_add] = (content == 'Reentrant') or 'Yes' in content or 'yes' in content
-            else:
-                self._elem_attributes[self._attr_to_add] = content
-        elif self._rownum == 7:
-            self._assert_syntax(colnum in [2, 3], node.line)
-            if colnum == 2:
-                if content == 'None' or content == 'none':
-                    content = 'void'
-                self._elem_attributes[self._attr_to_add] = { 'type': content }
-            else:
-                self._elem_attributes[self._attr_to_add]['description'] = self._get_description(content)
-        else:
-            self._assert_syntax(colnum in [2, 3], node.line)
+    # Conversions of the single-cell attribute values, the other values are taken as they are.
+    _VALUE_CONVERTERS = {
+        'description': lambda self, content: self._get_description(content),
+        'allowed-from-isr': lambda self, content: self._is_yes(content),
+        'is-reentrant': lambda self, content: (content == 'Reentrant') or self._is_yes(content),
+    }
+
+    # Single-cell attribute rows at the top of the tables.
+    def _add_value_attribute(self, colnum, node, content):
+        self._assert_syntax(colnum == 2, node.line)
+        self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
+        converter = self._VALUE_CONVERTERS.get(self._attr_to_add)
+        self._elem_attributes[self._attr_to_add] = converter(self, content) if converter else content
+
+    def _add_stripped_value_attribute(self, colnum, node, content):
+        self._assert_syntax(colnum == 2, node.line)
+        self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
+        self._elem_attributes[self._attr_to_add] = content.strip()
+
+    def _add_type_definition(self, colnum, node, content):
+        assert 'kind' in self._elem_attributes
+        if self._attr_to_add == 'elements':
+            self._assert_syntax(self._elem_attributes['kind'] == 'Structure', node.line)
+            self._assert_syntax(colnum in [2, 3, 4], node.line)
             self._elem_attributes.setdefault(self._attr_to_add, [])
             if colnum == 2:
-                self._elem_attributes[self._attr_to_add].append({ 'name': content })
-            else:
+                self._elem_attributes[self._attr_to_add].append(StructElement(type=content))
+            elif colnum == 3:
+                self._elem_attributes[self._attr_to_add][-1]['field'] = content
+            elif colnum == 4:
                 self._elem_attributes[self._attr_to_add][-1]['description'] = self._get_description(content)
-
-    def _add_macro_constants_attribute(self, colnum, node, content):
-        if self._rownum < 3:
+        elif self._attr_to_add == 'type':
             self._assert_syntax(colnum == 2, node.line)
-            self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
-            self._elem_attributes[self._attr_to_add] = self._get_description(content) if self._attr_to_add == 'description' else content
-        else:
+            self._elem_attributes[self._attr_to_add] = content
+        elif self._attr_to_add == 'constants':
+            self._assert_syntax(self._elem_attributes['kind'] == 'Enumeration', node.line)
             self._assert_syntax(colnum in [2, 3, 4], node.line)
             self._elem_attributes.setdefault(self._attr_to_add, [])
             if colnum == 2:
-                self._elem_attributes[self._attr_to_add].append({ 'name': content })
+                self._elem_attributes[self._attr_to_add].append(Constant(name=content))
             elif colnum == 3:
-                self._elem_attributes[self._attr_to_add][-1]['value'] = content.replace('\n', ' \\\n   ')
+                self._elem_attributes[self._attr_to_add][-1]['value'] = content
             else:
                 self._elem_attributes[self._attr_to_add][-1]['description'] = self._get_description(content)
 
-    def _add_variable_attribute(self, colnum, node, content):
-        # _attr_to_add = 'variables-group'
-        if self._rownum < 3:
-            self._assert_syntax(colnum == 2, node.line)
-            self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
-            self._elem_attributes[self._attr_to_add] = content.strip()
+    def _join_lines(self, content):
+        return content.replace('\n', ' ')
+
+    def _add_return_value(self, colnum, node, content, describe):
+        self._assert_syntax(colnum in [2, 3], node.line)
+        if colnum == 2:
+            if content == 'None' or content == 'none':
+                content = 'void'
+            self._elem_attributes[self._attr_to_add] = ReturnValue(type=content)
         else:
-            self._assert_syntax(colnum in [2, 3], node.line)
-            self._elem_attributes.setdefault(self._attr_to_add, [])
-            if colnum == 2:
-                # Description or Syntax
-                subattr = content.lower().replace(':', '')
-                if subattr == 'description':
-                    self._elem_attributes[self._attr_to_add].append({})
-                self._subattr_to_add = subattr
-            else:
-                self._elem_attributes[self._attr_to_add][-1][self._subattr_to_add] = content
+            self._elem_attributes[self._attr_to_add]['description'] = describe(content)
 
-    def _add_macro_function_attribute(self, colnum, node, content):
-        if self._rownum < 7:
-            self._assert_syntax(colnum == 2, node.line)
-            self._assert_syntax(self._attr_to_add not in self._elem_attributes, node.line)
-            if self._attr_to_add == 'description':
-                self._elem_attributes[self._attr_to_add] = self._get_description(content)
-            elif self._attr_to_add == 'allowed-from-isr':
-                self._elem_attributes[self._attr_to_add] = 'Yes' in content or 'yes' in content
-            elif self._attr_to_add == 'is-reentrant':
-                self._elem_attributes[self._attr_to_add] = (content == 'Reentrant') or 'Yes' in content or 'yes' in content
-            else:
-                self._elem_attributes[self._attr_to_add] = content
-        elif self._rownum == 7:
-            self._assert_syntax(colnum in [2, 3], node.line)
-            if colnum == 2:
-                if content == 'None' or content == 'none':
-                    content = 'void'
-                self._elem_attributes[self._attr_to_add] = { 'type': content }
-            else:
-                self._elem_attributes[self._attr_to_add]['description'] = content.replace('\n', ' ')
+    def _add_function_return_value(self, colnum, node, content):
+        self._add_return_value(colnum, node, content, self._get_description)
+
+    def _add_macro_function_return_value(self, colnum, node, content):
+        self._add_return_value(colnum, node, content, self._join_lines)
+
+    def _add_parameter(self, colnum, node, content, describe):
+        self._assert_syntax(colnum in [2, 3], node.line)
+        self._elem_attributes.setdefault(self._attr_to_add, [])
+        if colnum == 2:
+            self._elem_attributes[self._attr_to_add].append(Parameter(name=content))
         else:
-            self._assert_syntax(colnum in [2, 3], node.line)
-            self._elem_attributes.setdefault(self._attr_to_add, [])
-            if self._attr_to_add != 'definition':
-                if colnum == 2:
-                    self._elem_attributes[self._attr_to_add].append({ 'name': content })
+            self._elem_attributes[self._attr_to_add][-1]['description'] = describe(content)
+
+    def _add_function_parameter(self, colnum, node, content):
+        self._add_parameter(colnum, node, content, self._get_description)
+
+    def _add_macro_constant(self, colnum, node, content):
+        self._assert_syntax(colnum in [2, 3, 4], node.line)
+        self._elem_attributes.setdefault(self._attr_to_add, [])
+        if colnum == 2:
+            self._elem_attributes[self._attr_to_add].append(Constant(name=content))
+        elif colnum == 3:
+            self._elem_attributes[self._attr_to_add][-1]['value'] = content.replace('\n', ' \\\n   ')
+        else:
+            self._elem_attributes[self._attr_to_add][-1]['description'] = self._get_description(content)
+
+    def _add_variable(self, colnum, node, content):
+        # _attr_to_add = 'variables'
+        self._assert_syntax(colnum in [2, 3], node.line)
+        self._elem_attributes.setdefault(self._attr_to_add, [])
+        if colnum == 2:
+            # Description or Syntax
+            subattr = content.lower().replace(':', '')
+            if subattr == 'description':
+                self._elem_attributes[self._attr_to_add].append(Variable())
+            self._subattr_to_add = subattr
+        else:
+            self._elem_attributes[self._attr_to_add][-1][self._subattr_to_add] = content
+
+    def _add_macro_function_parameter_or_definition(self, colnum, node, content):
+        if self._attr_to_add != 'definition':
+            self._add_parameter(colnum, node, content, self._join_lines)
+            return
+        self._assert_syntax(colnum in [2, 3], node.line)
+        self._elem_attributes.setdefault(self._attr_to_add, [])
+        if colnum == 2:
+            subattr = content.lower().replace(':', '')
+            #Allow to skip the condition for condition-less macros.
+            if len(self._elem_attributes[self._attr_to_add]) == 0 or subattr == 'condition':
+                self._elem_attributes[self._attr_to_add].append(Definition())
+            self._subattr_to_add = subattr
+        else:
+            self._assert_syntax(self._subattr_to_add == 'condition', node.line)
+            condition_content = content.replace('``', '').replace('\n', ' ')
+            if condition_content == 'default':
+                condition_content = ''
+            self._elem_attributes[self._attr_to_add][-1][self._subattr_to_add] = condition_content
+            if len(self._elem_attributes[self._attr_to_add]) == 1:
+                if condition_content != '':
+                    self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#if"
                 else:
-                    self._elem_attributes[self._attr_to_add][-1]['description'] = content.replace('\n', ' ')
+                    self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = ""
+            elif condition_content != '':
+                self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#elif"
             else:
-                if colnum == 2:
-                    subattr = content.lower().replace(':', '')
-                    #Allow to skip the condition for condition-less macros.
-                    if len(self._elem_attributes[self._attr_to_add]) == 0 or subattr == 'condition':
-                        self._elem_attributes[self._attr_to_add].append({ })
-                    self._subattr_to_add = subattr
-                else:
-                    self._assert_syntax(self._subattr_to_add == 'condition', node.line)
-                    condition_content = content.replace('``', '').replace('\n', ' ')
-                    if condition_content == 'default':
-                        condition_content = ''
-                    self._elem_attributes[self._attr_to_add][-1][self._subattr_to_add] = condition_content
-                    if len(self._elem_attributes[self._attr_to_add]) == 1:
-                        if condition_content != '':
-                            self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#if"
-                        else:
-                            self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = ""
-                    elif condition_content != '':
-                        self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#elif"
-                    else:
-                        self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#else"
+                self._elem_attributes[self._attr_to_add][-1]['prepro-conditional'] = "#else"
+
+    # Row layout of the SW element tables: (first row, handler of the value cells). A handler is used from
+    # its first row up to the first row of the next one, the last handler for all remaining rows.
+    _TABLE_ROWS = {
+        _TYPE_TABLE: [ (1, '_add_value_attribute'), (5, '_add_type_definition') ],
+        _FUNCTION_TABLE: [ (1, '_add_value_attribute'), (7, '_add_function_return_value'),
+                           (8, '_add_function_parameter') ],
+        _MACRO_CONSTANTS_TABLE: [ (1, '_add_value_attribute'), (3, '_add_macro_constant') ],
+        _VARIABLE_TABLE: [ (1, '_add_stripped_value_attribute'), (3, '_add_variable') ],
+        _MACRO_FUNCTION_TABLE: [ (1, '_add_value_attribute'), (7, '_add_macro_function_return_value'),
+                                 (8, '_add_macro_function_parameter_or_definition') ],
+    }
+
+    @classmethod
+    def _compile_table_schema(cls):
+        """Compile _ROW_KEYS and _TABLE_ROWS into the lookup tables used for every table cell:
+        (state, row label) -> KeyEntry, (state, row) -> handler, and state -> handler of the remaining rows."""
+        cls._ROW_LABELS = {}
+        for row_spec in cls._ROW_KEYS:
+            for state in row_spec.tables:
+                cls._ROW_LABELS.setdefault((state, row_spec.row_label), row_spec)
+        cls._ROW_HANDLERS = {}
+        cls._LAST_ROW_HANDLERS = {}
+        for state, rows in cls._TABLE_ROWS.items():
+            for (first_row, handler_name), (next_row, _) in zip(rows, rows[1:]):
+                for rownum in range(first_row, next_row):
+                    cls._ROW_HANDLERS[(state, rownum)] = getattr(cls, handler_name)
+            cls._LAST_ROW_HANDLERS[state] = getattr(cls, rows[-1][1])
+
+    def _find_row_spec(self, content):
+        row_spec = self._ROW_LABELS.get((self._state, content))
+        if row_spec is None:
+            # Labels with extra text around them, searched once per distinct label.
+            key = (self._state, content)
+            if key not in self._row_label_matches:
+                self._row_label_matches[key] = next((rs for rs in self._ROW_KEYS
+                                                     if rs.row_label in content and self._state in rs.tables), None)
+            row_spec = self._row_label_matches[key]
+        return row_spec
 
     def _add_file_description(self, colnum, node, content):
         if self._rownum == 1:
@@ -372,24 +446,22 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
             if self._state == self._SOURCE_FILE_TABLE:
                 self._add_file_description(colnum, node, content)
             elif colnum == 1:
-                row_label_found = False
-                for row_spec in self._ROW_KEYS:
-                    if row_spec.row_label in content and self._state in row_spec.tables.keys():
-                        expected_rownum = row_spec.tables[self._state]
-                        if expected_rownum > -1:
-                            self._assert_syntax(self._rownum == expected_rownum, node.line)
-                        self._attr_to_add = row_spec.attr_key
-                        row_label_found = True
-                        break
-                if not row_label_found:
+                row_spec = self._find_row_spec(content)
+                if row_spec is not None:
+                    expected_rownum = row_spec.tables[self._state]
+                    if expected_rownum > -1:
+                        self._assert_syntax(self._rownum == expected_rownum, node.line)
+                    self._attr_to_add = row_spec.attr_key
+                else:
                     elem_type = self._state.replace('_', ' ')
                     print("WARNING: unrecognized " + elem_type + " attribute " + content)
             else:
                 if self._state == self._FUNCTION_TABLE and content == "'...":
                     content = "..."
-                add_method_name = '_add_' + self._state.replace('_table', '') + '_attribute'
-                add_method = getattr(self, add_method_name)
-                add_method(colnum, node, content)
+                add_method = self._ROW_HANDLERS.get((self._state, self._rownum))
+                if add_method is None:
+                    add_method = self._LAST_ROW_HANDLERS[self._state]
+                add_method(self, colnum, node, content)
 
 
     def _strip_code_block(self, str):
@@ -428,10 +500,9 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
 
     def visit_uml(self, node: uml) -> None:
         if self._state == self._SOURCE_FILE_DEPENDENCIES:
-            depScanner = UmlDependencyScanner()
-            self._assert_syntax(hasattr(node, 'parse_tree'), node.line,
+            self._assert_syntax(node.is_restuml2code, node.line,
                                         msg='File dependency diagram not found, or missing :restuml2code: directive')
-            depScanner.visit_topdown(tree=node.parse_tree)
+            depScanner = node.scan_dependencies(self._uml_cache)
             for header in depScanner.header_deps:
                 if header not in self._headers:
                     self._add_header(header)
@@ -456,16 +527,17 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
         if self._state == self._PASS:
             #global field
             #Any global field may be added to header attributes except for the reserved ones.
-            if field_name in [ a.name for a in self._HEADER_ATTRIBUTES ]:
+            if field_name in self._RESERVED_FIELDS:
                 self._assert_syntax(False, node.line, msg = "'" + field_name + "' cannot be used for a global field name" )
             else:
                 self._globals[field_name] = field_body
 
-    # Copy global attributes to all headers.
+    # Add the global attributes to all headers. The headers share the dict of them, which keeps the
+    # work per header constant however many global fields there are.
     def depart_document(self, node: docutils.nodes.document) -> None:
-        for gf in self._globals:
-            for header in self._headers:
-                self._headers[header][gf] = self._globals[gf]
+        self._globals.update(self._global_overrides)
+        for header in self._headers.values():
+            header.share_fields(self._globals)
 
 
     def unknown_visit(self, node: docutils.nodes.Node) -> None:
@@ -483,3 +555,5 @@ class RestProcessor(docutils.nodes.SparseNodeVisitor):
                 msg = 'Error (line ' + str(line) +'): ' + msg
             print(msg)
             raise RuntimeError(msg)
+
+RestProcessor._compile_table_schema()
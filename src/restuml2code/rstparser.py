@@ -0,0 +1,100 @@
+#
+# restuml2code
+# Copyright (C) 2022  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import copy
+import docutils.nodes
+import docutils.parsers.rst
+import docutils.utils
+import docutils.frontend
+from docutils.parsers.rst import Directive
+
+try:
+    from .uml import uml
+    from .item import item
+except:
+    from uml import uml
+    from item import item
+
+class UmlDirective(Directive):
+
+    required_arguments = 0
+    optional_arguments = 0
+    final_argument_whitespace = True
+    option_spec = {}
+    has_content = True
+
+    node_class = uml
+
+    def run(self):
+        self.assert_has_content()
+        text = '\n'.join(self.content)
+        uml_node = self.node_class(rawsource=text)
+        return [uml_node]
+
+class ItemDirective(Directive):
+
+    required_arguments = 1
+    optional_arguments = 0
+    final_argument_whitespace = True
+    option_spec = {}
+    has_content = False
+
+    node_class = item
+
+    def run(self):
+        text = '\n'.join(self.content)
+        item_node = self.node_class(rawsource=text)
+        # Parse the directive contents.
+        self.state.nested_parse(self.content, self.content_offset, item_node)
+        return [ item_node ]
+
+class IgnoredDirective(Directive):
+
+    required_arguments = 0
+    optional_arguments = 0
+    final_argument_whitespace = True
+    option_spec = {}
+    has_content = True
+
+    def run(self):
+        return []
+
+class RstParser:
+    """The docutils parser and its default settings, set up once and used for all documents parsed
+    by the process. Not to be used by several threads at once."""
+
+    def __init__(self) -> None:
+        self._parser = docutils.parsers.rst.Parser()
+        components = (docutils.parsers.rst.Parser,)
+        self._settings = docutils.frontend.OptionParser(components=components).get_default_values()
+
+    def parse(self, srcpath: str, text: str) -> docutils.nodes.document:
+        document = docutils.utils.new_document(srcpath, settings=copy.copy(self._settings))
+        self._parser.parse(text, document)
+        return document
+
+_parser = None
+
+def parse_rst(srcpath: str, text: str) -> docutils.nodes.document:
+    global _parser
+    if _parser is None:
+        _parser = RstParser()
+    return _parser.parse(srcpath, text)
+
+def sphinx_role_fn(name, rawtext, text, lineno, inliner, options={}, content=[]):
+    return [], []
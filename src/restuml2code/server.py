@@ -0,0 +1,303 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# Generation server for IDE and build tool integration.
+#
+# The server keeps worker processes with the directives registered, the uml parser built, the
+# compiled templates and the caches loaded, and answers requests over a UNIX socket or a localhost
+# TCP port. The requests and responses are JSON objects, one per line:
+#
+#   request:  { "id": ..., "command": "generate" | "model", "input": ..., "template": ..., "odir": ...,
+#               "globals": { ... }, "options": { "dump": ..., "verbose": ..., "write_if_changed": ..., ... } }
+#   response: { "id": ..., "ok": ..., "log": ..., "outputs": [ ... ], "written": ..., "unchanged": ...,
+#               "skipped": ..., "model": { ... }, "time": { "queue": ..., "run": ..., "total": ... } }
+#
+# "template" is a -t argument or a list of them, or of { "path": ..., "output": ..., "filter": ... }
+# objects. "model" answers with the parsed header model instead of generating the headers. Requests on one
+# connection are processed concurrently and may be answered out of order, the id tells them apart.
+# restuml2code-client takes the restuml2code command line arguments and sends them to the server. The options
+# of _REQUEST_OPTIONS are sent with every request, the client writes the --report itself, and the options fixed
+# when the server starts (caches, pre-scan, profiling) are rejected by the client.
+#
+# A TCP server only listens on a loopback address, unless --allow-remote is given: the clients can write files
+# wherever the server can.
+
+import asyncio
+import ipaddress
+import json
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+from io import StringIO
+
+try:
+    from .main import make_arg_parser, get_jobs, print_summary, register_directives, make_caches, run_job, parse_model
+    from .job import Job, JobResult, TemplateSpec, parse_template_spec
+    from . import manifest
+    from .contentmodel import as_dict
+except:
+    from main import make_arg_parser, get_jobs, print_summary, register_directives, make_caches, run_job, parse_model
+    from job import Job, JobResult, TemplateSpec, parse_template_spec
+    import manifest
+    from contentmodel import as_dict
+
+# Per-request options, the other options are fixed when the server starts.
+_REQUEST_OPTIONS = ['dump', 'verbose', 'write_if_changed', 'from_model', 'export_model', 'depfile', 'depfile_target',
+                    'depfile_phony', 'render_jobs']
+# Options of the client itself.
+_CLIENT_OPTIONS = ['input', 'templ', 'odir', 'manifest', 'shard', 'report', 'merge', 'jobs', 'address', 'model', 'timing']
+
+def default_address() -> str:
+    if hasattr(os, 'getuid'):
+        return os.path.join(tempfile.gettempdir(), 'restuml2code-%d.sock' % os.getuid())
+    return '127.0.0.1:8642'
+
+def _is_loopback(host: str) -> bool:
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host.strip('[]')).is_loopback
+    except ValueError:
+        return False
+
+def _split_tcp_address(address, allow_remote: bool = False):
+    """Return (host, port) for a 'host:port' address, or None for a UNIX socket path. Hosts other than
+    the loopback addresses are refused without allow_remote."""
+    host, sep, port = address.rpartition(':')
+    if sep and port.isdigit() and '/' not in address:
+        host = host or '127.0.0.1'
+        if not allow_remote and not _is_loopback(host):
+            raise RuntimeError("Error: " + host + " is not a loopback address, use --allow-remote to listen on it")
+        return host.strip('[]'), int(port)
+    return None
+
+# State of a server worker process, set up once by _init_worker().
+_worker_args = None
+_worker_caches = None
+
+def _init_worker(args):
+    global _worker_args, _worker_caches
+    register_directives()
+    _worker_args = args
+    _worker_caches = make_caches(args)
+
+def _generate(job: Job, options) -> dict:
+    start = time.perf_counter()
+    args = dict(_worker_args, **options)
+    out = StringIO()
+    with redirect_stdout(out):
+        result = run_job(job, args, _worker_caches)
+    return { 'ok': result.ok, 'log': out.getvalue(), 'outputs': result.outputs, 'written': result.written,
+             'unchanged': result.unchanged, 'skipped': result.skipped, 'run': time.perf_counter() - start }
+
+def _model(job: Job, options) -> dict:
+    start = time.perf_counter()
+    args = dict(_worker_args, **options)
+    out = StringIO()
+    response = { 'ok': True }
+    with redirect_stdout(out):
+        try:
+            with open(job.input, 'r') as f:
+                response['model'] = parse_model(job, f.read(), args, _worker_caches)
+        except Exception as e:
+            print("ERROR: " + job.input + ": " + str(e))
+            response['ok'] = False
+    response['log'] = out.getvalue()
+    response['run'] = time.perf_counter() - start
+    return response
+
+class GenerationServer:
+
+    def __init__(self, args, num_workers: int) -> None:
+        import multiprocessing
+        self._pool = multiprocessing.Pool(num_workers, _init_worker, (args,))
+        self._verbose = args['verbose']
+
+    def _submit(self, fn, *fn_args) -> asyncio.Future:
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        def done(result):
+            loop.call_soon_threadsafe(future.set_result, result)
+        def failed(e):
+            loop.call_soon_threadsafe(future.set_exception, e)
+        self._pool.apply_async(fn, fn_args, callback=done, error_callback=failed)
+        return future
+
+    async def _process(self, request) -> dict:
+        start = time.perf_counter()
+        try:
+            if 'error' in request:
+                raise ValueError(request['error'])
+            templates = request.get('template', [])
+            if not isinstance(templates, list):
+                templates = [templates]
+            job = Job(request['input'], [TemplateSpec(**t) if isinstance(t, dict) else parse_template_spec(t) for t in templates],
+                      request.get('odir'), request.get('globals'))
+            options = { k: v for k, v in request.get('options', {}).items() if k in _REQUEST_OPTIONS }
+            command = request.get('command', 'generate')
+            if command == 'generate':
+                response = await self._submit(_generate, job, options)
+            elif command == 'model':
+                response = await self._submit(_model, job, options)
+            else:
+                response = { 'ok': False, 'log': "ERROR: unknown command " + str(command) + "\n", 'run': 0.0 }
+        except Exception as e:
+            response = { 'ok': False, 'log': "ERROR: invalid request: " + str(e) + "\n", 'run': 0.0 }
+        total = time.perf_counter() - start
+        response['id'] = request.get('id')
+        response['time'] = { 'queue': total - response['run'], 'run': response.pop('run'), 'total': total }
+        if self._verbose:
+            print("%s %s: %.1f ms" % (request.get('command', 'generate'), request.get('input'), total * 1000))
+        return response
+
+    async def _handle(self, reader, writer) -> None:
+        lock = asyncio.Lock()
+        tasks = []
+
+        async def answer(request):
+            response = await self._process(request)
+            async with lock:
+                writer.write((json.dumps(response, default=as_dict) + '\n').encode('utf-8'))
+                await writer.drain()
+
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                request = { 'command': 'invalid', 'input': None, 'error': str(e) }
+            tasks.append(asyncio.ensure_future(answer(request)))
+        if len(tasks) > 0:
+            await asyncio.wait(tasks)
+        writer.close()
+
+    def serve(self, address: str, allow_remote: bool = False) -> None:
+        tcp_address = _split_tcp_address(address, allow_remote)
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        if tcp_address is not None:
+            server = loop.run_until_complete(asyncio.start_server(self._handle, *tcp_address))
+        else:
+            if os.path.exists(address):
+                os.unlink(address)
+            server = loop.run_until_complete(asyncio.start_unix_server(self._handle, address))
+            os.chmod(address, 0o600)
+        print("restuml2code server listening on " + address)
+        try:
+            loop.run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            self._pool.terminate()
+            if tcp_address is None and os.path.exists(address):
+                os.unlink(address)
+
+def main():
+    parser = make_arg_parser()
+    parser.add_argument("--listen", dest="address", help="UNIX socket path or HOST:PORT (default: %(default)s)",
+                        metavar="ADDRESS", default=default_address(), required=False)
+    parser.add_argument("--allow-remote", dest="allow_remote",
+                        help="listen on a TCP address other than loopback, which lets the hosts reaching it write files",
+                        default=False, required=False, action='store_true')
+    args = vars(parser.parse_args())
+    try:
+        _split_tcp_address(args['address'], args['allow_remote'])
+    except RuntimeError as e:
+        parser.error(str(e))
+    GenerationServer(args, max(args['jobs'], 1)).serve(args['address'], args['allow_remote'])
+
+async def _send_requests(address, requests):
+    tcp_address = _split_tcp_address(address, True)
+    if tcp_address is not None:
+        reader, writer = await asyncio.open_connection(*tcp_address)
+    else:
+        reader, writer = await asyncio.open_unix_connection(address)
+    for request in requests:
+        writer.write((json.dumps(request) + '\n').encode('utf-8'))
+    await writer.drain()
+    if writer.can_write_eof():
+        writer.write_eof()
+    responses = {}
+    while len(responses) < len(requests):
+        line = await reader.readline()
+        if not line:
+            break
+        response = json.loads(line)
+        responses[response['id']] = response
+    writer.close()
+    return responses
+
+def client_main():
+    parser = make_arg_parser()
+    parser.add_argument("--connect", dest="address", help="server address (default: %(default)s)",
+                        metavar="ADDRESS", default=default_address(), required=False)
+    parser.add_argument("--model", dest="model", help="print the content models as JSON instead of generating headers",
+                        default=False, required=False, action='store_true')
+    parser.add_argument("--timing", dest="timing", help="print the time each request took",
+                        default=False, required=False, action='store_true')
+    args = vars(parser.parse_args())
+    defaults = vars(parser.parse_args([]))
+    for name in args:
+        if name not in _REQUEST_OPTIONS and name not in _CLIENT_OPTIONS and args[name] != defaults[name]:
+            parser.error("--" + name.replace('_', '-') + " is not supported by the client, give it to "
+                         "restuml2code-server or run restuml2code")
+    jobs = get_jobs(args, parser)
+
+    options = { k: args[k] for k in _REQUEST_OPTIONS }
+    for name in ['depfile', 'export_model']:
+        if options[name] is not None:
+            options[name] = os.path.abspath(options[name])
+    requests = []
+    for n, job in enumerate(jobs):
+        requests.append({ 'id': n, 'command': 'model' if args['model'] else 'generate',
+                          'input': os.path.abspath(job.input),
+                          'template': [t._replace(path=os.path.abspath(t.path))._asdict() for t in job.templ],
+                          'odir': job.odir and os.path.abspath(job.odir), 'globals': job.globals, 'options': options })
+    loop = asyncio.new_event_loop()
+    responses = loop.run_until_complete(_send_requests(args['address'], requests))
+    loop.close()
+
+    results = []
+    for n, job in enumerate(jobs):
+        response = responses.get(n, { 'ok': False, 'log': "ERROR: " + job.input + ": no response from server\n" })
+        print(response['log'], end='')
+        if args['model'] and response['ok']:
+            print(json.dumps(response['model'], indent=3))
+        if args['timing'] and 'time' in response:
+            print("%s: %.1f ms (queued %.1f ms)" % (job.input, response['time']['total'] * 1000,
+                                                    response['time']['queue'] * 1000))
+        results.append(JobResult(job, response['ok'], response.get('outputs', []), response.get('written', 0),
+                                 response.get('unchanged', 0), response.get('skipped', 0)))
+
+    if args['report'] is not None:
+        manifest.write_report(args['report'], results, args['shard'])
+    if not args['model']:
+        failed = print_summary(results, args)
+    else:
+        failed = [r.job.input for r in results if not r.ok]
+    if len(failed) > 0:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
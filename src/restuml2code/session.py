@@ -0,0 +1,78 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+# In-process interface for build tools written in Python. A Session registers the directives and roles,
+# sets up the caches and keeps the rst parser and the compiled templates, so that parsing and rendering
+# many documents in a loop costs no setup per document. A Session writes no files, the caller writes
+# the rendered text:
+#
+#   session = Session()
+#   for path in inputs:
+#       with open(path) as f:
+#           model = session.parse(f.read(), path)
+#       for output, text in session.render(model, 'templates/header.h'):
+#           ...
+
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+try:
+    from .main import make_arg_parser, register_directives, make_caches, parse_model, load_template, render_content
+    from .job import Job, TemplateSpec, parse_template_spec
+except:
+    from main import make_arg_parser, register_directives, make_caches, parse_model, load_template, render_content
+    from job import Job, TemplateSpec, parse_template_spec
+
+class Session:
+    """Parses design documents and renders their headers in this process.
+
+    The options are the command line options by their argparse names, e.g. verbose=True,
+    no_model_cache=True or cache_dir='build/cache'. The other options keep their defaults. The options
+    about writing the outputs (write_if_changed, depfile, report, ...) have no effect, a Session does
+    not write them.
+    """
+
+    def __init__(self, **options) -> None:
+        self.args = vars(make_arg_parser().parse_args([]))
+        for name in options:
+            if name not in self.args:
+                raise RuntimeError("Error: unknown session option '" + name + "'")
+        self.args.update(options)
+        register_directives()
+        self.caches = make_caches(self.args)
+
+    def parse(self, text: str, source: str = '<string>',
+              global_overrides: Optional[Dict[str, str]] = None) -> dict:
+        """Return the header model of the document text. source names the document in the messages.
+
+        Raises RuntimeError for errors in the document.
+        """
+        return parse_model(Job(source, [], None, global_overrides), text, self.args, self.caches)
+
+    def render(self, model: dict, template: Union[str, TemplateSpec]) -> Iterator[Tuple[str, str]]:
+        """Render the generated headers of the model one at a time and yield (output file name, text).
+
+        The template is a TemplateSpec or a string as given to -t, e.g. 'header.h,filter=Det*.h'.
+        Exceptions of the template are not caught.
+        """
+        if not isinstance(template, TemplateSpec):
+            template = parse_template_spec(template)
+        templ = load_template(template.path, self.args['verbose'], self.caches.templates)
+        for header, content in model.items():
+            if content['generated'] and template.renders(header):
+                output = template.output_name(header)
+                yield output, render_content(templ, header, output, content)
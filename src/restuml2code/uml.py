@@ -17,8 +17,14 @@
 #
 
 import docutils.nodes
-from lark import Lark
-import os
+from typing import Optional
+
+try:
+    from .umlparser import _GRAMMAR_FILE, get_grammar, get_parser, UmlDependencies, UmlScanCache
+    from . import profiling
+except:
+    from umlparser import _GRAMMAR_FILE, get_grammar, get_parser, UmlDependencies, UmlScanCache
+    import profiling
 
 class uml(docutils.nodes.General, docutils.nodes.Element):
 
@@ -26,10 +32,20 @@ class uml(docutils.nodes.General, docutils.nodes.Element):
 
         docutils.nodes.Element.__init__(self, rawsource, *children, **attributes)
 
-        if ':restuml2code:' in rawsource:
-            dir_path = os.path.dirname(os.path.realpath(__file__))
-            grammar_file_path = os.path.join(dir_path, "puml.ebnf")
-            f = open(grammar_file_path)
+        # Parsing is deferred until the diagram is needed, see scan_dependencies().
+        self.is_restuml2code = ':restuml2code:' in rawsource
+
+    def scan_dependencies(self, cache: Optional[UmlScanCache] = None) -> UmlDependencies:
+        """Parse the diagram and return the collected headers and header_deps.
 
-            parser = Lark(f.read(), debug=True)
-            self.parse_tree = parser.parse(rawsource + '\n')
+        No parse tree is built or kept with the node. With a cache, unchanged diagrams are not parsed again.
+        """
+        with profiling.stage('uml'):
+            if cache is not None:
+                scanner = cache.get(self.rawsource)
+                if scanner is not None:
+                    return scanner
+            scanner = get_parser(scan_dependencies=True).parse(self.rawsource + '\n')
+            if cache is not None:
+                cache.put(self.rawsource, scanner)
+            return scanner
@@ -16,15 +16,15 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
-from lark.visitors import Visitor
+from lark.visitors import Visitor, Transformer
 from lark import Token, Tree
 
-class UmlDependencyScanner(Visitor):
+try:
+    from .umlparser import UmlDependencies
+except:
+    from umlparser import UmlDependencies
 
-    def __init__(self) -> None:
-        super().__init__()
-        self.headers = []
-        self.header_deps = {}
+class UmlDependencyScanner(UmlDependencies, Visitor):
 
     def _get_element_name(self, element, tree):
         data = element + '_name'
@@ -40,9 +40,7 @@ class UmlDependencyScanner(Visitor):
         artifact_name = self._get_element_name("artifact", tree)
         for c in tree.children:
             if c.data == "stereotype":
-                stereotype_name = self._get_element_name("stereotype", c)
-                if stereotype_name == 'header' and artifact_name not in self.headers:
-                    self.headers.append(artifact_name)
+                self.add_artifact(artifact_name, self._get_element_name("stereotype", c))
 
     def _get_relation_attributes(self, tree):
         attr = {}
@@ -57,7 +55,55 @@ class UmlDependencyScanner(Visitor):
         return attr
 
     def dependency(self, tree):
-        dep_attr = self._get_relation_attributes(tree)
-        if dep_attr["stereotype"] == "include" and dep_attr["relation_from"] in self.headers:
-            self.header_deps.setdefault(dep_attr["relation_from"], [])
-            self.header_deps[dep_attr["relation_from"]].append(dep_attr["relation_to"])
+        self.add_dependency(self._get_relation_attributes(tree))
+
+# Used as the transformer of an LALR parser, so the rules are reduced while parsing and no parse tree is built.
+# Artifacts and dependencies are passed up as tuples in source order and fed to UmlDependencies at the end.
+class UmlDependencyTransformer(Transformer):
+
+    def __default__(self, data, children, meta):
+        # Inlined rules (named '_...') must stay trees, their children get spliced into the parent rule.
+        if data.startswith('_'):
+            return Tree(data, children)
+        found = []
+        for c in children:
+            if isinstance(c, list):
+                found += c
+        return found
+
+    def _name(self, children):
+        return children[0].value
+
+    artifact_name = _name
+    stereotype_name = _name
+
+    def stereotype(self, children):
+        return ("stereotype", children[0])
+
+    def relation_from(self, children):
+        return ("relation_from", children[0].value)
+
+    def relation_to(self, children):
+        return ("relation_to", children[0].value)
+
+    def artifact(self, children):
+        stereotype_name = None
+        nested = []
+        for c in children[1:]:
+            if isinstance(c, tuple):
+                stereotype_name = c[1]
+            else:
+                nested = c
+        return [("artifact", children[0], stereotype_name)] + nested
+
+    def dependency(self, children):
+        return [("dependency", dict(c for c in children if isinstance(c, tuple)))]
+
+    def start(self, children):
+        scanner = UmlDependencies()
+        for c in self.__default__("start", children, None):
+            if c[0] == "artifact":
+                scanner.add_artifact(c[1], c[2])
+            else:
+                scanner.add_dependency(c[1])
+        return scanner
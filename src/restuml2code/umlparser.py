@@ -0,0 +1,99 @@
+#
+# restuml2code
+# Copyright (C) 2022  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+from typing import Optional
+
+try:
+    from . import __version__
+    from .cache import FileCache, make_key
+except:
+    from __init__ import __version__
+    from cache import FileCache, make_key
+
+_GRAMMAR_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "puml.ebnf")
+
+_grammar = None
+_parsers = {}
+
+def get_grammar() -> str:
+    global _grammar
+    if _grammar is None:
+        with open(_GRAMMAR_FILE) as f:
+            _grammar = f.read()
+    return _grammar
+
+def get_parser(scan_dependencies: bool = False) -> 'Lark':
+    """Return the shared LALR parser for restuml2code diagrams, building it on first use.
+
+    With scan_dependencies the parser does not build a parse tree. The header artifacts and their
+    <<include>> dependencies are collected while parsing and parse() returns populated UmlDependencies.
+    Lark is only imported here, so documents without diagrams to parse do not pay for it.
+    """
+    if scan_dependencies not in _parsers:
+        from lark import Lark
+        grammar = get_grammar()
+        if scan_dependencies:
+            try:
+                from .umldependencyscanner import UmlDependencyTransformer
+            except:
+                from umldependencyscanner import UmlDependencyTransformer
+            _parsers[scan_dependencies] = Lark(grammar, parser='lalr', transformer=UmlDependencyTransformer())
+        else:
+            _parsers[scan_dependencies] = Lark(grammar, parser='lalr')
+    return _parsers[scan_dependencies]
+
+class UmlDependencies:
+    """The header artifacts of a diagram and the headers each of them includes."""
+
+    def __init__(self, headers: Optional[list] = None, header_deps: Optional[dict] = None) -> None:
+        self.headers = headers if headers is not None else []
+        self.header_deps = header_deps if header_deps is not None else {}
+        # The headers again, for the membership tests of large diagrams.
+        self._header_set = set(self.headers)
+
+    def add_artifact(self, artifact_name, stereotype_name):
+        if stereotype_name == 'header' and artifact_name not in self._header_set:
+            self.headers.append(artifact_name)
+            self._header_set.add(artifact_name)
+
+    def add_dependency(self, dep_attr):
+        if dep_attr.get("stereotype") == "include" and dep_attr["relation_from"] in self._header_set:
+            self.header_deps.setdefault(dep_attr["relation_from"], [])
+            self.header_deps[dep_attr["relation_from"]].append(dep_attr["relation_to"])
+
+class UmlScanCache:
+    """On-disk cache of dependency scan results, keyed by the diagram text, the grammar and the tool version."""
+
+    def __init__(self, cache_dir: str, max_size: int) -> None:
+        self._cache = FileCache(cache_dir, max_size)
+
+    def _key(self, text: str) -> str:
+        return make_key(__version__, get_grammar(), text)
+
+    def get(self, text: str) -> Optional[UmlDependencies]:
+        data = self._cache.get(self._key(text))
+        if data is None:
+            return None
+        entry = json.loads(data)
+        return UmlDependencies(entry['headers'], entry['header_deps'])
+
+    def put(self, text: str, scanner: UmlDependencies) -> None:
+        entry = { 'headers': scanner.headers, 'header_deps': scanner.header_deps }
+        self._cache.put(self._key(text), json.dumps(entry).encode('utf-8'))
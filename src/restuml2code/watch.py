@@ -0,0 +1,43 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+from typing import Iterable, Set
+
+class FileWatcher:
+    """Detects changed files by polling their modification times and sizes."""
+
+    def __init__(self) -> None:
+        self._stats = {}
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+
+    def poll(self, paths: Iterable[str]) -> Set[str]:
+        """Return the paths changed since the previous poll. Paths seen for the first time are only recorded."""
+        changed = set()
+        for path in paths:
+            stat = self._stat(path)
+            if path in self._stats and self._stats[path] != stat:
+                changed.add(path)
+            self._stats[path] = stat
+        return changed
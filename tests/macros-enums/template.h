@@ -1,18 +1,5 @@
 ###
-<%!                                             \
-    def make_include_guard(file):               \
-        return file.upper().replace('.', '_')   \
-%>                                              \
-###
-<%!                                             \
-    def get_brief(descr):                       \
-        return descr[:descr.index(".")]         \
-%>                                              \
-<%!                                                                     \
-    def get_enum_initializer(item):                                     \
-        return ' = ' + item['value'] if 'value' in item else ''         \
-%>                                                                      \
-###
+<%! from restuml2code.helpers import get_enum_initializer %>\
 ### render_macro_constant()
 ###
 <%def name="render_macro_constant(const_item)" filter="trim">           \
@@ -24,7 +11,7 @@
 <%def name="render_macro_function(func_item)" filter="trim" >
 
 /**
- * @brief ${get_brief(func_item['description'])}
+ * @brief ${func_item['brief']}
 % for ipar in func_item['in-params']:
  * @param[in] ${ipar['name']} - ${ipar['description']}
 % endfor
@@ -82,8 +69,8 @@ typedef enum ${type_item['type-name']} {
  *
  */
 
-#ifndef TEST_${make_include_guard(file)}
-#define TEST_${make_include_guard(file)}
+#ifndef TEST_${content['include-guard']}
+#define TEST_${content['include-guard']}
 
 % for cg in content['macro-constants']:
 /** ${cg['constants-group']} */
@@ -102,4 +89,4 @@ ${render_macro_function(mf)}
 ${render_type(t)}
 
 % endfor
-#endif //TEST_${make_include_guard(file)}
\ No newline at end of file
+#endif //TEST_${content['include-guard']}
\ No newline at end of file
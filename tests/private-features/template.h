@@ -1,22 +1,5 @@
 ###
-<%!                                             \
-    def make_include_guard(file):               \
-        return file.upper().replace('.', '_')   \
-%>                                              \
-###
-<%!                                             \
-    def get_brief(descr):                       \
-        return descr[:descr.index(".")]         \
-%>                                              \
-###
-<%!                                             \
-    def get_group(content,item):                \
-        return content['module'] if not item['private'] else content['module']+'Private'    \
-%>                                              \
-<%!                                                                     \
-    def get_enum_initializer(item):                                     \
-        return ' = ' + item['value'] if 'value' in item else ''         \
-%>                                                                      \
+<%! from restuml2code.helpers import get_group, get_enum_initializer %>\
 ###################################################
 ###
 ### render_macro_constant()
@@ -29,7 +12,7 @@
 ###
 <%def name="render_macro_function(func_item)" filter="trim" >           \
 /**
- * @brief ${get_brief(func_item['description'])}
+ * @brief ${func_item['brief']}
  * @ingroup ${get_group(content, func_item)}
  *
 % for ipar in func_item['in-params']:
@@ -63,7 +46,7 @@ ${func_item['syntax']}   <%text>\</%text>
 ###
 <%def name="render_type(type_item)" filter="trim">                      \
 /**
- * @brief ${get_brief(type_item['description'])}
+ * @brief ${type_item['brief']}
  * @ingroup ${get_group(content, type_item)}
  */
 % if type_item['kind'] == 'Typedef':
@@ -94,7 +77,7 @@ ${var_item['syntax']};      ///< ${var_item['description']}
 ###
 <%def name="render_function(func_item)" filter="trim">                  \
 /**
- * @brief ${get_brief(func_item['description'])}
+ * @brief ${func_item['brief']}
  * @ingroup ${get_group(content, func_item)}
  *
 % for ipar in func_item['in-params']:
@@ -122,8 +105,8 @@ ${func_item['syntax']};
  *
  */
 
-#ifndef TEST_${make_include_guard(file)}
-#define TEST_${make_include_guard(file)}
+#ifndef TEST_${content['include-guard']}
+#define TEST_${content['include-guard']}
 ##
 % if content['file-name'] == content['module'].lower() + '.h':
 
@@ -181,4 +164,4 @@ ${render_function(f)}
 
 % endfor
 ##
-#endif //TEST_${make_include_guard(file)}
\ No newline at end of file
+#endif //TEST_${content['include-guard']}
\ No newline at end of file
@@ -0,0 +1,52 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+from restuml2code.cache import FileCache, MemoryModelCache
+
+def test_memory_model_cache_evicts_least_recently_used():
+    cache = MemoryModelCache(2)
+    cache.put('a', None, { 'A.h': 1 })
+    cache.put('b', None, { 'B.h': 2 })
+    assert cache.get('a') == { 'A.h': 1 }
+    cache.put('c', None, { 'C.h': 3 })
+    assert cache.get('b') is None
+    assert cache.get('a') == { 'A.h': 1 }
+    assert cache.get('c') == { 'C.h': 3 }
+
+def test_memory_model_cache_keys_global_overrides():
+    cache = MemoryModelCache(2)
+    cache.put('a', None, { 'A.h': 1 })
+    cache.put('a', { 'module': 'M' }, { 'A.h': 2 })
+    assert cache.get('a') == { 'A.h': 1 }
+    assert cache.get('a', { 'module': 'M' }) == { 'A.h': 2 }
+
+def test_file_cache_counts_rewritten_entry_once(tmp_path):
+    cache = FileCache(str(tmp_path), 1000)
+    for _ in range(10):
+        cache.put('key', b'x' * 300)
+    assert cache.get('key') == b'x' * 300
+    assert cache.usage() == (1, 300)
+
+def test_file_cache_unwritable_directory_is_not_fatal(tmp_path, capsys):
+    not_a_dir = tmp_path / 'file'
+    not_a_dir.write_text('')
+    cache = FileCache(str(not_a_dir / 'cache'), 1000)
+    cache.put('key', b'data')
+    cache.put('key', b'data')
+    assert cache.get('key') is None
+    assert capsys.readouterr().out.count('WARNING') == 1
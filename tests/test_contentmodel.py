@@ -0,0 +1,151 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+
+import pytest
+
+from restuml2code.contentmodel import Element, Function, Header, Parameter, as_dict, headers_from_dict
+
+def make_function():
+    func = Function(function_name='Can_Init', description='Initializes the module. Call it first.')
+    func['in-params'] = [ Parameter(name='Config', description='Configuration') ]
+    return func
+
+def test_slot_keys_iterate_in_layout_order():
+    func = Function(private=False, syntax='void Can_Init(void)', function_name='Can_Init')
+    assert list(func) == [ 'function-name', 'syntax', 'private' ]
+    assert len(func) == 3
+    assert 'syntax' in func
+    assert 'description' not in func
+
+def test_unset_slot_is_missing():
+    func = Function()
+    with pytest.raises(KeyError):
+        func['description']
+    with pytest.raises(KeyError):
+        del func['description']
+    assert func.get('description', '-') == '-'
+
+def test_extra_keys_follow_slot_keys():
+    func = make_function()
+    func['z-extra'] = 1
+    func['a-extra'] = 2
+    assert list(func) == [ 'function-name', 'description', 'in-params', 'z-extra', 'a-extra' ]
+    assert func['a-extra'] == 2
+    del func['z-extra']
+    assert 'z-extra' not in func
+    assert len(func) == 4
+    with pytest.raises(KeyError):
+        del func['z-extra']
+
+def test_derived_keys_are_not_stored():
+    func = make_function()
+    assert func['brief'] == 'Initializes the module'
+    assert 'brief' not in func
+    assert 'brief' not in list(func)
+    with pytest.raises(KeyError):
+        func['unknown']
+
+def test_as_dict_round_trip():
+    func = make_function()
+    func['extra'] = 'x'
+    text = json.dumps(func, default=as_dict)
+    assert json.loads(text) == { 'function-name': 'Can_Init', 'description': 'Initializes the module. Call it first.',
+                                 'in-params': [ { 'name': 'Config', 'description': 'Configuration' } ],
+                                 'extra': 'x' }
+    copy = Function.from_dict(json.loads(text))
+    assert isinstance(copy['in-params'][0], Parameter)
+    assert list(copy) == list(func)
+    assert json.dumps(copy, default=as_dict) == text
+    with pytest.raises(TypeError):
+        as_dict(object())
+
+def test_header_shared_fields():
+    shared = { 'module': 'Can', 'version': '1.0' }
+    first, second = Header('Can.h'), Header('Can_Types.h')
+    first.share_fields(shared)
+    second.share_fields(shared)
+    first['version'] = '2.0'
+    assert first['module'] == 'Can'
+    assert first['version'] == '2.0'
+    assert second['version'] == '1.0'
+    keys = list(first)
+    # Shared keys come last, a key set on the header is not repeated.
+    assert keys[-2:] == [ 'version', 'module' ]
+    assert keys.count('version') == 1
+    assert len(first) == len(keys)
+    assert 'module' in first
+
+def test_header_delete_shared_field_keeps_other_headers():
+    shared = { 'module': 'Can', 'version': '1.0' }
+    first, second = Header('Can.h'), Header('Can_Types.h')
+    first.share_fields(shared)
+    second.share_fields(shared)
+    del first['version']
+    assert 'version' not in first
+    assert first['module'] == 'Can'
+    assert second['version'] == '1.0'
+    assert shared == { 'module': 'Can', 'version': '1.0' }
+
+def test_header_derived_keys_follow_changes():
+    header = Header('Can.h')
+    assert header['include-guard'] == 'CAN_H'
+    header['file-name'] = 'Can_Types.h'
+    assert header['include-guard'] == 'CAN_TYPES_H'
+    header['functions'] = [ make_function(), Function(function_name='Can_Priv', private=True) ]
+    assert [ f['function-name'] for f in header['public-functions'] ] == [ 'Can_Init' ]
+    assert [ f['function-name'] for f in header['private-functions'] ] == [ 'Can_Priv' ]
+
+def test_headers_from_dict_round_trip():
+    header = Header('Can.h')
+    header['functions'] = [ make_function() ]
+    header.share_fields({ 'module': 'Can' })
+    text = json.dumps({ 'Can.h': header }, default=as_dict)
+    headers = headers_from_dict(json.loads(text))
+    assert isinstance(headers['Can.h']['functions'][0], Function)
+    assert headers['Can.h']['module'] == 'Can'
+    assert json.dumps(headers, default=as_dict) == text
+
+def test_element_is_a_mapping():
+    func = make_function()
+    assert isinstance(func, Element)
+    assert dict(func.items())['function-name'] == 'Can_Init'
+    func.update({ 'syntax': 'void Can_Init(void)' })
+    assert func.pop('syntax') == 'void Can_Init(void)'
+    assert 'syntax' not in func
+
+def test_header_derived_lists_follow_in_place_changes():
+    header = Header('Can.h')
+    header['functions'].append(make_function())
+    assert len(header['public-functions']) == 1
+    header['functions'].append(Function(function_name='Can_Write', private=False))
+    header['functions'].sort(key=lambda f: f['function-name'], reverse=True)
+    assert [ f['function-name'] for f in header['public-functions'] ] == [ 'Can_Write', 'Can_Init' ]
+    header['includes'].extend([ 'b.h', 'a.h' ])
+    assert header['sorted-includes'] == [ 'a.h', 'b.h' ]
+    header['includes'].append('0.h')
+    assert header['sorted-includes'] == [ '0.h', 'a.h', 'b.h' ]
+
+def test_header_derived_lists_are_not_shared():
+    header = Header('Can.h')
+    header['functions'] = [ make_function() ]
+    # A template changing the list it got does not change what the next template gets.
+    header['public-functions'].clear()
+    assert len(header['public-functions']) == 1
+    assert header['public-functions'] is not header['public-functions']
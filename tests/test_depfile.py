@@ -0,0 +1,38 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+
+from restuml2code import depfile
+from restuml2code.umlparser import _GRAMMAR_FILE
+
+def test_tool_dependencies_cover_the_sources():
+    names = [ os.path.basename(f) for f in depfile.tool_dependencies() ]
+    for name in ('__init__.py', 'helpers.py', 'contentmodel.py', 'restprocessor.py', 'puml.ebnf'):
+        assert name in names
+    assert os.path.abspath(_GRAMMAR_FILE) not in depfile.tool_dependencies(parses_rst=False)
+    assert 'helpers.py' in [ os.path.basename(f) for f in depfile.tool_dependencies(parses_rst=False) ]
+
+def test_depfile_lists_the_sources(tmp_path):
+    template = tmp_path / 'template.h'
+    template.write_text("<%include file='common.mako'/>\n")
+    (tmp_path / 'common.mako').write_text("\n")
+    content = depfile.depfile_content('design.rst', [ str(template) ], [ 'out/Det.h' ])
+    assert content.startswith('out/Det.h: \\\n  design.rst \\\n')
+    assert str(tmp_path / 'common.mako') in content
+    assert os.path.join(os.path.dirname(depfile.__file__), 'helpers.py') in content
@@ -0,0 +1,130 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import os
+import shutil
+import subprocess
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Runs restuml2code in a fresh interpreter and prints the heavy packages it loaded.
+RUN_MAIN = """
+import sys
+sys.argv = ['restuml2code'] + sys.argv[1:]
+from restuml2code.main import main
+try:
+    main()
+finally:
+    print('LOADED:', ' '.join(m for m in ('docutils', 'lark', 'mako') if m in sys.modules))
+"""
+
+def run_main(cwd, *args):
+    """Run restuml2code with the arguments in cwd and return its exit status and the loaded packages."""
+    process = subprocess.run([ sys.executable, '-c', RUN_MAIN ] + list(args), cwd=str(cwd),
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, universal_newlines=True)
+    loaded = process.stdout.rsplit('LOADED:', 1)[1].split()
+    return process.returncode, loaded, process.stdout
+
+def make_project(tmp_path):
+    shutil.copy(os.path.join(TESTS_DIR, 'types-functions', 'input.rst'), str(tmp_path / 'input.rst'))
+    (tmp_path / 'template.h').write_text("/* ${file} of ${content['module']} */\n")
+    return tmp_path
+
+def test_output_cache_hit_loads_no_parser(tmp_path):
+    project = make_project(tmp_path)
+    args = [ '-i', 'input.rst', '-t', 'template.h', '-o', 'out', '--cache-dir', 'cache', '--output-cache', 'outputs' ]
+    status, loaded, output = run_main(project, *args)
+    assert status == 0, output
+    assert 'docutils' in loaded
+    status, loaded, output = run_main(project, *args)
+    assert status == 0, output
+    assert loaded == [], output
+
+def test_from_model_loads_no_parser(tmp_path):
+    project = make_project(tmp_path)
+    status, loaded, output = run_main(project, '-i', 'input.rst', '--export-model', 'model.json', '--no-model-cache')
+    assert status == 0, output
+    assert 'docutils' in loaded
+    status, loaded, output = run_main(project, '-i', 'model.json', '--from-model', '-t', 'template.h', '-o', 'out')
+    assert status == 0, output
+    assert 'docutils' not in loaded and 'lark' not in loaded, output
+    assert os.path.isfile(str(project / 'out' / 'Det.h'))
+
+def test_export_model_paths_must_differ(tmp_path):
+    for name in ('a', 'b'):
+        os.makedirs(str(tmp_path / name))
+        shutil.copy(os.path.join(TESTS_DIR, 'types-functions', 'input.rst'), str(tmp_path / name / 'input.rst'))
+    status, _, output = run_main(tmp_path, '-i', '*/input.rst', '--export-model', 'models/{name}.json')
+    assert status == 2
+    assert 'models/input.json for both' in output
+    assert not os.path.exists(str(tmp_path / 'models'))
+    status, _, output = run_main(tmp_path, '-i', '*/input.rst', '--export-model', 'models/{dir}.json')
+    assert status == 0, output
+    assert sorted(os.listdir(str(tmp_path / 'models'))) == [ 'a.json', 'b.json' ]
+
+def test_depfile_paths_must_differ(tmp_path):
+    make_project(tmp_path)
+    for name in ('a', 'b'):
+        os.makedirs(str(tmp_path / name))
+        shutil.copy(str(tmp_path / 'input.rst'), str(tmp_path / name / 'input.rst'))
+    status, _, output = run_main(tmp_path, '-i', '*/input.rst', '-t', 'template.h', '-o', 'out',
+                                 '--depfile', 'deps/{name}.d')
+    assert status == 2
+    assert 'deps/input.d for both' in output
+    assert not os.path.exists(str(tmp_path / 'out'))
+
+def test_edited_tool_source_changes_the_cache_salt(monkeypatch, tmp_path):
+    from restuml2code import depfile, main
+    sources = depfile.source_files()
+    salt = main._sources_key()
+    helpers = [ path for path in sources if os.path.basename(path) == 'helpers.py' ][0]
+    edited = tmp_path / 'helpers.py'
+    with open(helpers) as f:
+        edited.write_text(f.read() + '# edited\n')
+    monkeypatch.setattr(depfile, 'source_files', lambda: [ str(edited) if path == helpers else path for path in sources ])
+    assert main._sources_key() != salt
+
+def test_watch_leaves_unchanged_outputs_alone(monkeypatch, tmp_path):
+    from restuml2code import main
+    project = make_project(tmp_path)
+    monkeypatch.chdir(str(project))
+    args = vars(main.make_arg_parser().parse_args([ '-i', 'input.rst', '-t', 'template.h', '-o', 'out',
+                                                    '--cache-dir', 'cache' ]))
+    jobs = main.make_jobs(args)
+    assert all(result.ok for result in main.run_jobs(jobs, args))
+    os.utime('out/Det.h', (0, 0))
+    def stop(interval):
+        raise KeyboardInterrupt()
+    monkeypatch.setattr(main.time, 'sleep', stop)
+    main.watch(jobs, args, 0.0)
+    assert os.stat('out/Det.h').st_mtime == 0
+
+def test_inputs_writing_the_same_header_fail(tmp_path):
+    make_project(tmp_path)
+    for name in ('a', 'b'):
+        os.makedirs(str(tmp_path / name))
+        shutil.copy(str(tmp_path / 'input.rst'), str(tmp_path / name / 'input.rst'))
+    for jobs in ('1', '2'):
+        status, _, output = run_main(tmp_path, '-i', 'a/input.rst', '-i', 'b/input.rst', '-t', 'template.h', '-o', 'out',
+                                     '-j', jobs, '--no-model-cache')
+        assert status == 1, output
+        # With -j the jobs run concurrently, the first one to claim Det.h writes it.
+        assert ('Det.h is written for both a/input.rst and b/input.rst' in output or
+                'Det.h is written for both b/input.rst and a/input.rst' in output), output
+        assert 'Processed 2 input files, 1 failed' in output
@@ -0,0 +1,172 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import json
+import os
+
+import pytest
+
+from restuml2code.contentmodel import as_dict
+from restuml2code.main import parse_rst, register_directives
+from restuml2code.prescan import prune
+from restuml2code.restprocessor import RestProcessor
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+DOCUMENT = """\
+===========
+Design Spec
+===========
+
+:module: Can
+:version: 1.0
+          continued
+
+.. default-role:: code
+
+Introduction
+============
+
+Some prose RestProcessor does not read.
+
+* a list item
+* another one
+
+Functions
+=========
+
+Can_Init
+--------
+
+The function table.
+
+Requirements
+============
+
+:requirement-set: R1
+
+More prose.
+"""
+
+def kept_lines(text):
+    return [ line for line in prune(text, RestProcessor._SECTION_STATE_MAP).splitlines() if line != '' ]
+
+def test_prune_keeps_line_numbers():
+    pruned = prune(DOCUMENT, RestProcessor._SECTION_STATE_MAP)
+    assert pruned.count('\n') == DOCUMENT.count('\n')
+    for original, line in zip(DOCUMENT.splitlines(), pruned.splitlines()):
+        assert line in ('', original)
+
+def test_prune_keeps_titles_sections_fields_and_roles():
+    kept = kept_lines(DOCUMENT)
+    # All titles with their adornments.
+    for title in [ 'Design Spec', 'Introduction', 'Functions', 'Can_Init', 'Requirements' ]:
+        assert title in kept
+    assert kept.count('===========') == 2
+    # The unindented field lists, the global fields of any section, with their continuation lines.
+    assert ':module: Can' in kept
+    assert '          continued' in kept
+    assert ':requirement-set: R1' in kept
+    assert '.. default-role:: code' in kept
+    # Everything in a section RestProcessor reads.
+    assert 'The function table.' in kept
+    # Prose, lists and the fields of other sections are blanked out.
+    assert 'Some prose RestProcessor does not read.' not in kept
+    assert '* a list item' not in kept
+    assert 'More prose.' not in kept
+
+def test_prune_keeps_role_directive_in_pruned_section():
+    text = "Introduction\n============\n\n.. role:: raw-c(code)\n\nProse.\n"
+    kept = kept_lines(text)
+    assert '.. role:: raw-c(code)' in kept
+    assert 'Prose.' not in kept
+
+def test_prune_does_not_touch_documents_with_includes():
+    text = "Introduction\n============\n\nProse.\n\n  .. include:: other.rst\n"
+    assert prune(text, RestProcessor._SECTION_STATE_MAP) is text
+
+INDENTED_FIELDS = """
+Notes
+=====
+
+.. note::
+
+   :reviewer: Jane
+
+Prose.
+
+    :quoted: yes
+
+* A list item
+  continued
+
+  :listed: yes
+
+.. table::
+   :align: left
+
+   =====  =====
+   A      B
+   =====  =====
+"""
+
+def test_prune_keeps_blocks_with_indented_field_lists():
+    kept = kept_lines(INDENTED_FIELDS)
+    for line in [ '.. note::', '   :reviewer: Jane', 'Prose.', '    :quoted: yes', '* A list item', '  :listed: yes' ]:
+        assert line in kept
+    # The options of a directive are not global fields.
+    assert '.. table::' not in kept
+    assert '   :align: left' not in kept
+
+def parse_model(path, text):
+    doc = parse_rst(path, text)
+    visitor = RestProcessor(doc, text)
+    doc.walkabout(visitor)
+    return json.dumps(visitor._headers, sort_keys=True, default=as_dict)
+
+@pytest.mark.parametrize('project', [ 'types-functions', 'macros-enums' ])
+def test_pruned_model_is_unchanged(project):
+    register_directives()
+    path = os.path.join(TESTS_DIR, project, 'input.rst')
+    with open(path) as f:
+        text = f.read()
+    pruned = prune(text, RestProcessor._SECTION_STATE_MAP)
+    assert pruned != text
+    assert parse_model(path, pruned) == parse_model(path, text)
+
+def test_pruned_model_fails_alike():
+    register_directives()
+    path = os.path.join(TESTS_DIR, 'private-features', 'input.rst')
+    with open(path) as f:
+        text = f.read()
+    errors = []
+    for source in (text, prune(text, RestProcessor._SECTION_STATE_MAP)):
+        with pytest.raises(RuntimeError) as e:
+            parse_model(path, source)
+        errors.append(str(e.value))
+    assert errors[0] == errors[1]
+
+def test_pruned_model_keeps_indented_fields():
+    register_directives()
+    path = os.path.join(TESTS_DIR, 'types-functions', 'input.rst')
+    with open(path) as f:
+        text = f.read() + INDENTED_FIELDS
+    model = parse_model(path, text)
+    for field in ('reviewer', 'quoted', 'listed'):
+        assert '"' + field + '"' in model
+    assert parse_model(path, prune(text, RestProcessor._SECTION_STATE_MAP)) == model
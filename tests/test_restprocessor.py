@@ -0,0 +1,101 @@
+#
+# restuml2code
+# Copyright (C) 2023  Arthur Wisz
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+#
+
+import docutils.nodes
+
+from restuml2code.main import parse_rst
+from restuml2code.restprocessor import RestProcessor
+
+# Cells spanning columns (B, H) and rows (C, J, K). The column of a cell is the count of the cells to its
+# left in its source line, with the cells spanning down from the rows above.
+SPANNED_TABLE = """
++-------+------+------+
+| A     | B           |
++-------+------+------+
+| C     | D    | E    |
+|       +------+------+
+|       | F    | G    |
++-------+------+------+
+| H            | I    |
++-------+------+------+
+| J     | K    | L    |
++       +      +------+
+|       |      | M    |
++-------+------+------+
+"""
+
+def make_processor(text):
+    doc = parse_rst('test.rst', text)
+    return doc, RestProcessor(doc, text)
+
+def test_column_index_of_spanned_cells():
+    doc, processor = make_processor(SPANNED_TABLE)
+    table = next(iter(doc.traverse(docutils.nodes.table)))
+    columns = processor._index_columns(table)
+    found = { entry.astext(): columns[id(entry)] for entry in table.traverse(docutils.nodes.entry) }
+    assert found == { 'A': 1, 'B': 2, 'C': 1, 'D': 2, 'E': 3, 'F': 2, 'G': 3, 'H': 1, 'I': 2,
+                      'J': 1, 'K': 2, 'L': 3, 'M': 3 }
+
+def test_get_colnum_of_paragraphs():
+    doc, processor = make_processor(SPANNED_TABLE)
+    table = next(iter(doc.traverse(docutils.nodes.table)))
+    processor.visit_table(table)
+    found = { p.astext(): processor.get_colnum(p) for p in table.traverse(docutils.nodes.paragraph) }
+    assert found['F'] == 2
+    assert found['I'] == 2
+    assert found['M'] == 3
+
+def test_row_spec_exact_label():
+    _, processor = make_processor('')
+    processor._state = RestProcessor._TYPE_TABLE
+    assert processor._find_row_spec('Type name:').attr_key == 'type-name'
+    assert processor._find_row_spec('Type:').attr_key == 'type'
+    processor._state = RestProcessor._FUNCTION_TABLE
+    assert processor._find_row_spec('Description:').attr_key == 'description'
+    # Not a row of function tables.
+    assert processor._find_row_spec('Kind:') is None
+
+def test_row_spec_label_with_extra_text():
+    _, processor = make_processor('')
+    processor._state = RestProcessor._FUNCTION_TABLE
+    assert processor._find_row_spec('Parameters [in]: (optional)').attr_key == 'in-params'
+    assert processor._find_row_spec('Parameters [in-out]: none').attr_key == 'inout-params'
+    assert processor._find_row_spec('Unknown label') is None
+
+def test_row_handlers_of_table_schema():
+    handlers = RestProcessor._ROW_HANDLERS
+    last_handlers = RestProcessor._LAST_ROW_HANDLERS
+    assert handlers[(RestProcessor._FUNCTION_TABLE, 1)] is RestProcessor._add_value_attribute
+    assert handlers[(RestProcessor._FUNCTION_TABLE, 6)] is RestProcessor._add_value_attribute
+    assert handlers[(RestProcessor._FUNCTION_TABLE, 7)] is RestProcessor._add_function_return_value
+    # The rows from the last entry on, e.g. any number of parameters.
+    assert (RestProcessor._FUNCTION_TABLE, 8) not in handlers
+    assert last_handlers[RestProcessor._FUNCTION_TABLE] is RestProcessor._add_function_parameter
+    assert handlers[(RestProcessor._VARIABLE_TABLE, 2)] is RestProcessor._add_stripped_value_attribute
+    assert last_handlers[RestProcessor._TYPE_TABLE] is RestProcessor._add_type_definition
+def test_row_spec_fallback_is_memoized():
+    _, processor = make_processor('')
+    processor._state = RestProcessor._MACRO_FUNCTION_TABLE
+    spec = processor._find_row_spec('Definition: (per target)')
+    assert processor._find_row_spec('Unknown label') is None
+    # Found again without searching _ROW_KEYS.
+    processor._ROW_KEYS = []
+    assert processor._find_row_spec('Definition: (per target)') is spec
+    assert processor._find_row_spec('Unknown label') is None
+    assert processor._row_label_matches[(RestProcessor._MACRO_FUNCTION_TABLE, 'Definition: (per target)')] is spec
+
@@ -1,13 +1,3 @@
-###
-<%!                                             \
-    def make_include_guard(file):               \
-        return file.upper().replace('.', '_')   \
-%>                                              \
-###
-<%!                                             \
-    def get_brief(descr):                       \
-        return descr[:descr.index(".")]         \
-%>                                              \
 ### render_type() ###
 <%def name="render_type(type_item)">            \
 
@@ -30,7 +20,7 @@ typedef struct ${type_item['type-name']} {
 <%def name="render_function(func_item)">        \
 
 /**
- * @brief ${get_brief(func_item['description'])}
+ * @brief ${func_item['brief']}
  * @ingroup ${content['module']}
  *
 % for ipar in func_item['in-params']:
@@ -58,8 +48,8 @@ ${func_item['syntax']};
  *
  */
 
-#ifndef TEST_${make_include_guard(file)}
-#define TEST_${make_include_guard(file)}
+#ifndef TEST_${content['include-guard']}
+#define TEST_${content['include-guard']}
 % if content['file-name'] == content['module'] + '.h':
 
 /*!
@@ -79,4 +69,4 @@ ${func_item['syntax']};
     ${render_function(f)}
 % endfor
 
-#endif //TEST_${make_include_guard(file)}
\ No newline at end of file
+#endif //TEST_${content['include-guard']}
\ No newline at end of file